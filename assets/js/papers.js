@@ -1,4 +1,5 @@
-const PAPERS_PATH = 'site_data/papers.json';
+const DATA_DIR = 'site_data';
+const PAPERS_NAME = 'papers.json';
 const papersListNode = document.getElementById('papers-list');
 const metaNode = document.getElementById('papers-meta');
 const errorNode = document.getElementById('papers-error');
@@ -105,7 +106,21 @@ const showError = (message) => {
   }
 };
 
-fetch(`${PAPERS_PATH}?cachebust=${Date.now()}`)
+// The manifest is tiny and revalidated on every view; the content-hashed file
+// it names never changes, so the browser and CDN may cache it indefinitely.
+const resolvePapersPath = () =>
+  fetch(`${DATA_DIR}/manifest.json`, { cache: 'no-cache' })
+    .then((response) => (response.ok ? response.json() : {}))
+    .catch(() => ({}))
+    .then((manifest) => {
+      const entry = manifest[PAPERS_NAME];
+      return entry && entry.file
+        ? { path: `${DATA_DIR}/${entry.file}`, cache: 'default' }
+        : { path: `${DATA_DIR}/${PAPERS_NAME}`, cache: 'no-cache' };
+    });
+
+resolvePapersPath()
+  .then(({ path, cache }) => fetch(path, { cache }))
   .then((response) => {
     if (!response.ok) {
       throw new Error(`Failed to load papers (${response.status})`);
@@ -0,0 +1,118 @@
+"""Content-hashed, precompressed JSON artifacts for the static site.
+
+:func:`publish` writes a payload three ways:
+
+* the logical file (``site_data/papers.json``), minified, for scripts and
+  the RAG build that read it by name;
+* a content-hashed copy (``site_data/papers.3f9c2a1b7e04.json``) with
+  ``.gz`` and, when the ``brotli`` module is installed, ``.br`` siblings for
+  hosts and CDNs that serve precompressed files;
+* an entry in the directory's ``manifest.json``::
+
+      {"papers.json": {"file": "papers.3f9c2a1b7e04.json", "sha256": "...",
+                       "bytes": 5120, "gzip_bytes": 1400, "br_bytes": 1210,
+                       "previous": "papers.91d0e6c4a2f8.json"}}
+
+Pages fetch the small manifest with revalidation and the hashed file it
+names with default caching, so the data itself can be cached forever and is
+only downloaded again when its content changes.  Publishing the same content
+twice is a no-op.  Older hashed versions are removed, except the one listed
+as ``previous``, which pages holding an older manifest may still request.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import pathlib
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written without it
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+
+
+def minified(payload: Any) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def hashed_name(path: pathlib.Path, digest: str) -> str:
+    return f"{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}"
+
+
+def _write_atomic(path: pathlib.Path, data: bytes) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(directory: pathlib.Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _prune(path: pathlib.Path, keep: List[str]) -> List[pathlib.Path]:
+    """Delete hashed versions of ``path`` other than ``keep`` (and their compressed siblings)."""
+    pattern = re.compile(
+        rf"^{re.escape(path.stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(path.suffix)}(\.gz|\.br)?$"
+    )
+    removed = []
+    for candidate in path.parent.iterdir():
+        match = pattern.match(candidate.name)
+        if match and candidate.name[: len(candidate.name) - len(match.group(1) or "")] not in keep:
+            candidate.unlink()
+            removed.append(candidate)
+    return removed
+
+
+def publish(path: pathlib.Path, payload: Any, logical: bool = True) -> Dict[str, Any]:
+    """Write ``payload`` as ``path`` plus its hashed, precompressed copy; return the manifest entry.
+
+    With ``logical=False`` the file at ``path`` itself is left untouched.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = minified(payload)
+    digest = hashlib.sha256(data).hexdigest()
+    target = path.with_name(hashed_name(path, digest))
+
+    if logical:
+        _write_atomic(path, data + b"\n")
+    entry: Dict[str, Any] = {"file": target.name, "sha256": digest, "bytes": len(data)}
+    if not target.exists():
+        _write_atomic(target, data)
+    gz_path = target.with_name(f"{target.name}.gz")
+    if not gz_path.exists():
+        # mtime=0 keeps the archive byte-identical across runs.
+        _write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+    entry["gzip_bytes"] = gz_path.stat().st_size
+    if brotli is not None:
+        br_path = target.with_name(f"{target.name}.br")
+        if not br_path.exists():
+            _write_atomic(br_path, brotli.compress(data, quality=11))
+        entry["br_bytes"] = br_path.stat().st_size
+
+    manifest = load_manifest(path.parent)
+    previous: Optional[Dict[str, Any]] = manifest.get(path.name)
+    if previous and previous.get("file") != target.name:
+        entry["previous"] = previous.get("file")
+    elif previous and previous.get("previous"):
+        entry["previous"] = previous["previous"]
+    if previous != entry:
+        manifest[path.name] = entry
+        _write_atomic(
+            path.parent / MANIFEST_NAME,
+            json.dumps(dict(sorted(manifest.items())), indent=2).encode("utf-8") + b"\n",
+        )
+    _prune(path, [name for name in (entry["file"], entry.get("previous")) if name])
+    return entry
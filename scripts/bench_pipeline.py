@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Benchmarks for the Python data pipeline on synthetic corpora.
+
+Generates a synthetic site (blog tree, ``papers.json``, ``_posts``, HTML
+pages) and full 100-row Google Scholar result pages in a temporary
+directory, then times extraction, HTML/Scholar parsing, chunking,
+embedding-stage plumbing (with the network stubbed out) and index
+serialization.  Results are written as JSON; pass ``--compare`` with an
+earlier result file to flag regressions.
+
+Usage:
+    python scripts/bench_pipeline.py --scale small
+    python scripts/bench_pipeline.py --scale large --output reports/bench.json
+    python scripts/bench_pipeline.py --compare reports/bench-main.json --threshold 0.15
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import build_rag_index
+from chunker import Chunker
+from embedding_backends import HashedNgramBackend
+from html_extract import extract_sections
+from rag_index_format import write_index
+from update_papers import ScholarPageParser
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(ROOT, "reports", "bench_pipeline.json")
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None  # for the hashed embedding backend
+STREAM_CHUNK = 16 * 1024  # decoded text per feed() in the streaming Scholar benchmark
+# Benchmarks faster than this are too noisy to flag as regressions.
+NOISE_FLOOR_S = 0.001
+
+SCALES = {
+    "small": {"blog_posts": 200, "jekyll_posts": 50, "papers": 200, "scholar_pages": 2, "vectors": 500, "dim": 768},
+    "medium": {"blog_posts": 2000, "jekyll_posts": 500, "papers": 1000, "scholar_pages": 5, "vectors": 2000, "dim": 768},
+    "large": {"blog_posts": 10000, "jekyll_posts": 2000, "papers": 5000, "scholar_pages": 10, "vectors": 10000, "dim": 768},
+}
+
+WORDS = (
+    "monte carlo tree search policy value reinforcement learning control heat pump energy "
+    "comfort rollout simulation reward agent state action model predictive horizon planning "
+    "uncertainty bandit exploration exploitation gradient network training dataset evaluation"
+).split()
+
+
+# -- synthetic inputs ------------------------------------------------------
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 20))
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def markdown_post(rng: random.Random, title: str) -> str:
+    parts = [f"# {title}", ""]
+    for i in range(rng.randint(3, 8)):
+        parts += [f"## Section {i}", "", paragraph(rng, rng.randint(3, 10)), ""]
+        parts += [f"- [{w}](https://example.org/{w})" for w in rng.choices(WORDS, k=3)] + [""]
+    return "\n".join(parts)
+
+
+def html_page(rng: random.Random, sections: int) -> str:
+    body = ["---", "layout: default", 'title: "Synthetic — Benchmark"', "---", "<header><p>Updated</p></header>",
+            "<article><div id=\"article_title\"><h1>Synthetic page</h1></div><div id=\"article_text\">"]
+    for i in range(sections):
+        body.append(f'<section class="status-section" id="s{i}"><h2>Section {i}</h2>')
+        body.append(f"<p>{paragraph(rng, 6)}</p><ul>")
+        body += [f"<li><strong>{w}:</strong> {sentence(rng)}</li>" for w in rng.choices(WORDS, k=5)]
+        body.append("</ul></section>")
+    body.append("</div></article><script>" + "var x = 1;" * 2000 + "</script>")
+    return "\n".join(body)
+
+
+def scholar_page(rng: random.Random, rows: int = 100) -> str:
+    """A Scholar profile page: large header/script regions around a ``gsc_a_tr`` table."""
+    head = (
+        "<html><head><style>" + ".gs_x{color:red}" * 3000 + "</style>"
+        + "<script>" + "var gs=1;" * 5000 + "</script></head><body>"
+        + "<div id=\"gs_hdr\">" + "".join(f'<a class="gs_btn" href="/h{i}"><span>Menu {i}</span></a>' for i in range(300))
+        + "</div><div id=\"gsc_prf\">" + "".join(f'<div class="gsc_prf_il">{sentence(rng)}</div>' for i in range(50))
+        + "</div><table id=\"gsc_a_t\"><tbody id=\"gsc_a_b\">"
+    )
+    body = []
+    for i in range(rows):
+        body.append(
+            '<tr class="gsc_a_tr"><td class="gsc_a_t">'
+            f'<a href="/citations?view_op=view_citation&amp;citation_for_view=x:{i}" class="gsc_a_at">{sentence(rng)}</a>'
+            f'<div class="gs_gray">A Author, B Author, C Author</div>'
+            f'<div class="gs_gray">Journal of {rng.choice(WORDS).title()} {rng.randint(1, 40)}, 2024<span class="gs_oph">, 2024</span></div>'
+            f'</td><td class="gsc_a_c"><a href="/c{i}" class="gsc_a_ac gs_ibl">{rng.randint(0, 500)}</a></td>'
+            f'<td class="gsc_a_y"><span class="gsc_a_h gsc_a_hc gs_ibl">{rng.randint(2015, 2025)}</span></td></tr>'
+        )
+    tail = "</tbody></table><div id=\"gsc_ftr\">" + "<p>footer</p>" * 500 + "</div><script>" + "var t=2;" * 5000 + "</script></body></html>"
+    return head + "".join(body) + tail
+
+
+def build_site(root: str, scale: Dict[str, int], seed: int = 0) -> Dict[str, object]:
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "blog", "posts"))
+    os.makedirs(os.path.join(root, "_posts"))
+    os.makedirs(os.path.join(root, "site_data"))
+    os.makedirs(os.path.join(root, "_data"))
+
+    posts = []
+    for i in range(scale["blog_posts"]):
+        slug = f"post-{i}"
+        with open(os.path.join(root, "blog", "posts", f"{slug}.md"), "w", encoding="utf-8") as f:
+            f.write(markdown_post(rng, f"Post {i}"))
+        posts.append({"title": f"Post {i}", "slug": slug, "file": f"{slug}.md", "date": "2025-01-01"})
+    with open(os.path.join(root, "blog", "posts", "posts.json"), "w", encoding="utf-8") as f:
+        json.dump(posts, f)
+
+    for i in range(scale["jekyll_posts"]):
+        with open(os.path.join(root, "_posts", f"2025-01-{i:05d}-post.md"), "w", encoding="utf-8") as f:
+            f.write(f'---\nlayout: default\ntitle: "Jekyll {i}"\n---\n\n' + markdown_post(rng, f"Jekyll {i}"))
+
+    publications = [
+        {
+            "title": sentence(rng), "authors": "A Author, B Author", "venue": f"Journal {i}",
+            "year": str(rng.randint(2015, 2025)), "citations": str(rng.randint(0, 500)),
+            "link": f"https://scholar.google.com/citations?citation_for_view=x:{i}",
+        }
+        for i in range(scale["papers"])
+    ]
+    with open(os.path.join(root, "site_data", "papers.json"), "w", encoding="utf-8") as f:
+        json.dump({"source": "Google Scholar", "count": len(publications), "publications": publications}, f, indent=2)
+
+    with open(os.path.join(root, "_data", "now.yml"), "w", encoding="utf-8") as f:
+        f.write('updated: "January 2026"\ncontent: "Benchmarking."\n')
+    page = html_page(rng, 20)
+    for name in ["index.html"] + build_rag_index.SITE_PAGES:
+        with open(os.path.join(root, name), "w", encoding="utf-8") as f:
+            f.write(page)
+
+    return {
+        "scholar_pages": [scholar_page(rng) for _ in range(scale["scholar_pages"])],
+        "html_page": page,
+        "long_text": " ".join(paragraph(rng, 50) for _ in range(scale["blog_posts"] // 10 or 1)),
+        "vectors": [[rng.uniform(-0.1, 0.1) for _ in range(scale["dim"])] for _ in range(scale["vectors"])],
+    }
+
+
+# -- stubs -----------------------------------------------------------------
+
+class StubClient:
+    """Offline stand-in for EmbeddingClient returning deterministic vectors."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+
+    def embed_many(self, texts, progress=None):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+            rng = random.Random(seed)
+            vectors.append([rng.uniform(-0.1, 0.1) for _ in range(self.dim)])
+        return vectors
+
+    def close(self) -> None:
+        pass
+
+
+# -- benchmarks ------------------------------------------------------------
+
+def timeit(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    summary = {"min_s": round(min(times), 6), "median_s": round(statistics.median(times), 6)}
+    if isinstance(result, int):
+        summary["items"] = result
+    return summary
+
+
+def run_benchmarks(scale_name: str, repeat: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    scale = SCALES[scale_name]
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as site:
+        data = build_site(site, scale, seed)
+        original_root = build_rag_index.ROOT
+        build_rag_index.ROOT = site
+        try:
+            chunker = Chunker()
+            for name, producer in build_rag_index.SOURCES:
+                results[f"extract.{name}"] = timeit(lambda p=producer: sum(1 for _ in p(chunker)), repeat)
+            results["extract.all"] = timeit(lambda: sum(1 for _ in build_rag_index.iter_chunks(chunker=chunker)), repeat)
+
+            def embed_stage() -> int:
+                args = argparse.Namespace(batch_size=50, workers=4, normalize=True, dimensions=scale["dim"], backend="gemini")
+                stats = {"chunks": 0, "embedded": 0, "skipped": 0}
+                original_make_client = build_rag_index.make_client
+                build_rag_index.make_client = lambda _args: StubClient(scale["dim"])
+                stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+                try:
+                    pairs = build_rag_index.embed_chunks(build_rag_index.iter_chunks(chunker=chunker), args, None, "stub", stats)
+                    return sum(1 for _ in build_rag_index.index_entries(pairs, args, stats))
+                finally:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+                    build_rag_index.make_client = original_make_client
+
+            results["embed_stage.stubbed"] = timeit(embed_stage, max(1, repeat // 2))
+
+            if HAVE_NUMPY:
+                texts = [chunk["text"] for chunk in build_rag_index.iter_chunks(chunker=chunker)]
+                backend = HashedNgramBackend(scale["dim"])
+                results["embed.hashed"] = timeit(lambda: len(backend.embed_many(texts)), repeat)
+        finally:
+            build_rag_index.ROOT = original_root
+
+        results["html.extract_sections"] = timeit(lambda: len(extract_sections(data["html_page"])[1]), repeat)
+        results["chunk.long_text"] = timeit(lambda: len(Chunker().spans(data["long_text"])), repeat)
+
+        def parse_scholar() -> int:
+            count = 0
+            for page in data["scholar_pages"]:
+                parser = ScholarPageParser(fast=False)
+                parser.feed(page)
+                parser.close()
+                count += len(parser.entries)
+            return count
+
+        def parse_scholar_streaming() -> int:
+            count = 0
+            for page in data["scholar_pages"]:
+                parser = ScholarPageParser()
+                for start in range(0, len(page), STREAM_CHUNK):
+                    parser.feed(page[start:start + STREAM_CHUNK])
+                    if parser.done:
+                        break
+                parser.close()
+                count += len(parser.entries)
+            return count
+
+        results["scholar.parse"] = timeit(parse_scholar, repeat)
+        results["scholar.parse_streaming"] = timeit(parse_scholar_streaming, repeat)
+
+        entries = [
+            {"id": f"c{i}", "title": "t", "text": "x" * 200, "source": "s", "embedding": vector}
+            for i, vector in enumerate(data["vectors"])
+        ]
+        for fmt in ("json", "f16", "int8"):
+            out = os.path.join(site, f"index-{fmt}.json")
+            results[f"serialize.{fmt}"] = timeit(
+                lambda f=fmt, o=out: write_index(o, entries, f, {"model": "bench"}) and len(entries), repeat
+            )
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or previous.get("min_s", 0) < NOISE_FLOOR_S:
+            continue
+        change = current["min_s"] / previous["min_s"] - 1
+        current["change_vs_baseline"] = round(change, 3)
+        if change > threshold:
+            regressions.append(f"{name}: {previous['min_s']:.4f}s -> {current['min_s']:.4f}s (+{change:.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'benchmark':<28} {'min ms':>10} {'median ms':>10} {'items':>8} {'vs base':>8}")
+    for name, row in results.items():
+        change = row.get("change_vs_baseline")
+        print(
+            f"{name:<28} {row['min_s'] * 1000:>10.2f} {row['median_s'] * 1000:>10.2f} "
+            f"{row.get('items', ''):>8} {'' if change is None else f'{change:+.0%}':>8}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline on synthetic corpora.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; min and median are reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results.")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="Earlier results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative slowdown of min time that counts as a regression (default 15%%).")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scale, max(1, args.repeat), args.seed)
+
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"WARNING: baseline scale {baseline.get('scale')!r} differs from {args.scale!r}", file=sys.stderr)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+
+    print_table(results)
+    payload = {
+        "scale": args.scale,
+        "params": SCALES[args.scale],
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+        "regressions": regressions,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+    print(f"\nWrote {args.output}")
+
+    if regressions:
+        print("\nRegressions:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,34 +6,44 @@ Reads site content (profile, papers, blog posts, status), chunks it,
 generates embeddings via Google Gemini embedding API, and writes a
 JSON index file that the Worker bundles at deploy time.
 
+The build is a generator pipeline: each content source in ``SOURCES`` is a
+producer yielding chunk dicts, embeddings are fetched a window at a time,
+and records are streamed to ``<output>.partial`` before being moved into
+place, so memory stays flat and an interrupted run keeps its progress (in
+the partial file and the embedding cache).
+
 Usage:
     export GEMINI_API_KEY="your-key"
-    python scripts/build_rag_index.py
+    python scripts/build_rag_index.py [--batch-size 50] [--workers 4] [--rpm 0]
+    python scripts/build_rag_index.py --backend hashed   # offline: no network or API key
 
 Output:
     worker/src/rag_index.json
 """
 
+import argparse
 import json
+import math
 import os
-import re
 import sys
-import urllib.request
-import urllib.error
+
+from chunker import Chunker, clean_markdown
+from dedup import CosineDeduper, Duplicates, MinHashDeduper
+from embedding_backends import BACKENDS, HASHED_DIMENSIONS, HashedNgramBackend, make_backend
+from embedding_cache import EmbeddingCache
+from html_extract import extract_sections
+import instrumentation
+from rag_index_format import FORMATS, IndexWriter
+from rag_lexical import Bm25Builder
+from rag_queries import AnticipatedQueries, read_queries
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 EMBED_MODEL = "models/gemini-embedding-001"
-EMBED_URL = f"https://generativelanguage.googleapis.com/v1beta/{EMBED_MODEL}:embedContent?key={GEMINI_API_KEY}"
+EMBED_DIMENSIONS = 3072
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-
-def strip_html(text):
-    """Remove HTML tags and collapse whitespace."""
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = re.sub(r"&[a-zA-Z]+;", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+DEFAULT_CACHE_PATH = os.path.join(ROOT, ".cache", "rag_embeddings.jsonl")
+SITE_PAGES = ["papers.html", "demos.html", "live.html", "travel.html", "blog.html"]
 
 
 def read_file(rel_path):
@@ -44,101 +54,33 @@ def read_file(rel_path):
         return f.read()
 
 
-def extract_chunks():
-    """Extract text chunks from all site content."""
-    chunks = []
-
-    # --- Profile from index.html ---
-    index_html = read_file("index.html")
-    if index_html:
-        body = strip_html(index_html)
-        # Remove YAML front matter
-        body = re.sub(r"^---.*?---", "", body, flags=re.DOTALL).strip()
-
-        chunks.append({
-            "id": "profile-about",
-            "source": "index.html",
-            "title": "About Muhammad Ibrahim Khan",
-            "text": (
-                "Muhammad Ibrahim Khan is a PhD researcher at Coventry University "
-                "working on Monte Carlo Tree Search (MCTS) for predictive control "
-                "of energy systems. His research develops tree-search methods that "
-                "let controllers plan ahead under uncertainty, using MCTS as a "
-                "model-predictive controller for heating systems. He previously "
-                "worked as an Associate AI Engineer at CureMD, building LLM-powered "
-                "code assistants, RAG chatbots, and automated code grading systems."
-            ),
-        })
-
-        chunks.append({
-            "id": "profile-education",
-            "source": "index.html",
-            "title": "Education",
-            "text": (
-                "PhD in Reinforcement Learning at Coventry University, UK. "
-                "Thesis: Predictive Control Through Monte Carlo Tree Search. "
-                "Expected completion March 2028. "
-                "BEng in Mechanical Engineering from the National University of "
-                "Sciences and Technology (NUST), Pakistan (2019-2023). "
-                "Final-year project: Autonomous Weeding Robot."
-            ),
-        })
-
-        chunks.append({
-            "id": "profile-experience",
-            "source": "index.html",
-            "title": "Work Experience",
-            "text": (
-                "Teaching Assistant and Lab Demonstrator at Coventry University "
-                "(Aug 2025 - Jan 2026): Ran weekly labs for 30+ MSc Data Science "
-                "students covering deep learning and computer vision. Marked 200+ "
-                "assignments per semester. "
-                "Associate AI Engineer at CureMD (Jul 2023 - Sep 2024): Built an "
-                "in-house LLM code assistant (Mixtral 8x7B + RAG) that cut code-review "
-                "turnaround by 25% across 150+ developers. Shipped RAG chatbots handling "
-                "500+ daily support queries with 92% resolution accuracy. Automated "
-                "candidate screening with Llama 3."
-            ),
-        })
-
-        chunks.append({
-            "id": "profile-skills",
-            "source": "index.html",
-            "title": "Technical Skills",
-            "text": (
-                "Languages: Python (primary), C++, MATLAB. "
-                "RL and Control: Stable Baselines3, RLLib, Gymnasium, MuJoCo. "
-                "ML and Deep Learning: PyTorch, TensorFlow, Scikit-learn, Hugging Face Transformers. "
-                "LLMs and NLP: LangChain, RAG pipelines, LoRA fine-tuning. "
-                "Infrastructure: Git, Docker, Linux, Weights and Biases."
-            ),
-        })
-
-        chunks.append({
-            "id": "profile-awards",
-            "source": "index.html",
-            "title": "Awards",
-            "text": (
-                "Fully Funded PhD Scholarship from Coventry University (Sep 2024). "
-                "Second Runner-Up at the Prime Minister's National Innovation Award 2023, "
-                "Government of Pakistan, for the Autonomous Weeding Robot project, "
-                "selected from over 40,000 entries nationwide."
-            ),
-        })
-
-        chunks.append({
-            "id": "profile-contact",
-            "source": "index.html",
-            "title": "Contact Information",
-            "text": (
-                "Email: ibrahimkhanlive1000@gmail.com. "
-                "LinkedIn: linkedin.com/in/ibrahimkhanlive1000. "
-                "GitHub: github.com/Ibrahimkhan4real. "
-                "Website: ibrahimkhan4real.github.io."
-            ),
-        })
-
-    # --- Papers from site_data/papers.json ---
+def html_chunks(chunker, rel_path, id_prefix):
+    """Section-level chunks of one HTML page, extracted in a single parser pass."""
+    page = read_file(rel_path)
+    if not page:
+        return
+    front_matter, sections = extract_sections(page)
+    # "Muhammad Ibrahim Khan — RL & Control Researcher" -> "Muhammad Ibrahim Khan"
+    page_name = front_matter.get("title", rel_path).split(" — ")[0].strip()
+    for section in sections:
+        heading = section["heading"] or page_name
+        title = heading if heading == page_name else f"{heading} — {page_name}"
+        yield from chunker.chunks(f"{id_prefix}-{section['key']}", rel_path, title, section["text"])
+
+
+def profile_chunks(chunker):
+    """Profile sections from index.html."""
+    yield from html_chunks(chunker, "index.html", "profile")
+
+
+def page_chunks(chunker):
+    """Sections of the other site pages listed in SITE_PAGES."""
+    for rel_path in SITE_PAGES:
+        yield from html_chunks(chunker, rel_path, f"page-{os.path.splitext(rel_path)[0]}")
+
+
+def paper_chunks(chunker):
+    """One chunk per publication in site_data/papers.json."""
     papers_json = read_file("site_data/papers.json")
     if papers_json:
         data = json.loads(papers_json)
@@ -161,14 +103,11 @@ def extract_chunks():
             if link:
                 text += f" Link: {link}."
 
-            chunks.append({
-                "id": f"paper-{i}",
-                "source": "site_data/papers.json",
-                "title": title,
-                "text": text,
-            })
+            yield from chunker.chunks(f"paper-{i}", "site_data/papers.json", title, text)
+
 
-    # --- Blog posts ---
+def blog_chunks(chunker):
+    """Blog posts listed in blog/posts/posts.json."""
     blog_posts_json = read_file("blog/posts/posts.json")
     if blog_posts_json:
         posts = json.loads(blog_posts_json)
@@ -176,133 +115,331 @@ def extract_chunks():
             md_file = post.get("file", "")
             md_content = read_file(f"blog/posts/{md_file}")
             if md_content:
-                # Strip markdown formatting lightly
-                clean = re.sub(r"#+ ", "", md_content)
-                clean = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", clean)
-                clean = re.sub(r"\s+", " ", clean).strip()
-
-                # Split long posts into ~500 char chunks
-                if len(clean) > 600:
-                    sentences = re.split(r"(?<=[.!?])\s+", clean)
-                    current_chunk = ""
-                    chunk_idx = 0
-                    for sent in sentences:
-                        if len(current_chunk) + len(sent) > 500 and current_chunk:
-                            chunks.append({
-                                "id": f"blog-{post.get('slug', md_file)}-{chunk_idx}",
-                                "source": f"blog/posts/{md_file}",
-                                "title": post.get("title", md_file),
-                                "text": current_chunk.strip(),
-                            })
-                            chunk_idx += 1
-                            current_chunk = sent
-                        else:
-                            current_chunk += " " + sent
-                    if current_chunk.strip():
-                        chunks.append({
-                            "id": f"blog-{post.get('slug', md_file)}-{chunk_idx}",
-                            "source": f"blog/posts/{md_file}",
-                            "title": post.get("title", md_file),
-                            "text": current_chunk.strip(),
-                        })
-                else:
-                    chunks.append({
-                        "id": f"blog-{post.get('slug', md_file)}",
-                        "source": f"blog/posts/{md_file}",
-                        "title": post.get("title", md_file),
-                        "text": clean,
-                    })
-
-    # --- Jekyll posts ---
+                yield from chunker.chunks(
+                    f"blog-{post.get('slug', md_file)}",
+                    f"blog/posts/{md_file}",
+                    post.get("title", md_file),
+                    clean_markdown(md_content),
+                )
+
+
+def jekyll_chunks(chunker):
+    """Jekyll posts under _posts/."""
     posts_dir = os.path.join(ROOT, "_posts")
     if os.path.isdir(posts_dir):
         for fname in sorted(os.listdir(posts_dir)):
             if fname.endswith(".md"):
                 content = read_file(f"_posts/{fname}")
                 if content:
-                    # Remove front matter
-                    content = re.sub(r"^---.*?---", "", content, flags=re.DOTALL).strip()
-                    clean = re.sub(r"#+ ", "", content)
-                    clean = re.sub(r"\s+", " ", clean).strip()
+                    clean = clean_markdown(content)
                     if len(clean) > 50:
-                        chunks.append({
-                            "id": f"jekyll-post-{fname}",
-                            "source": f"_posts/{fname}",
-                            "title": fname.replace(".md", "").replace("-", " "),
-                            "text": clean[:800],
-                        })
-
-    # --- Current status from _data/now.yml ---
+                        yield from chunker.chunks(
+                            f"jekyll-post-{fname}",
+                            f"_posts/{fname}",
+                            fname.replace(".md", "").replace("-", " "),
+                            clean,
+                        )
+
+
+def status_chunks(chunker):
+    """Current status from _data/now.yml."""
     now_yml = read_file("_data/now.yml")
     if now_yml:
-        chunks.append({
-            "id": "current-status",
-            "source": "_data/now.yml",
-            "title": "Current Status",
-            "text": now_yml.replace("updated:", "Last updated:").replace("content:", "Current focus:"),
-        })
-
-    return chunks
-
-
-def get_embedding(text):
-    """Call Gemini embedding API for a single text."""
-    payload = json.dumps({
-        "model": EMBED_MODEL,
-        "content": {"parts": [{"text": text}]},
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        EMBED_URL,
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST",
+        yield from chunker.chunks(
+            "current-status",
+            "_data/now.yml",
+            "Current Status",
+            now_yml.replace("updated:", "Last updated:").replace("content:", "Current focus:"),
+        )
+
+
+# Pluggable content producers: (name, generator function taking a Chunker and
+# yielding chunk dicts).
+SOURCES = [
+    ("profile", profile_chunks),
+    ("pages", page_chunks),
+    ("papers", paper_chunks),
+    ("blog", blog_chunks),
+    ("jekyll", jekyll_chunks),
+    ("status", status_chunks),
+]
+
+
+def iter_chunks(sources=None, chunker=None):
+    """Stream chunks from every producer (or only the named ``sources``)."""
+    chunker = chunker or Chunker()
+    for name, producer in SOURCES:
+        if sources is None or name in sources:
+            yield from producer(chunker)
+
+
+def extract_chunks(sources=None, chunker=None):
+    """Extract text chunks from all site content."""
+    return list(iter_chunks(sources, chunker))
+
+
+def normalize(vector):
+    """Scale a vector to unit length so cosine similarity becomes a dot product."""
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else list(vector)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the RAG index for the chatbot Worker.")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Texts per batchEmbedContents request (max 100).")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent embedding requests.")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="Requests-per-minute budget shared by all workers (0 = unlimited).")
+    parser.add_argument("--backend", choices=BACKENDS, default="gemini",
+                        help="Embedding backend: gemini (default) or hashed, a local character n-gram "
+                             "embedding that needs no network or API key (requires NumPy).")
+    parser.add_argument("--api-base", default=None,
+                        help="Override the Gemini API base URL (e.g. a local stand-in server).")
+    parser.add_argument("--output", default=os.path.join(ROOT, "worker", "src", "rag_index.json"),
+                        help="Destination for the generated index.")
+    parser.add_argument("--format", choices=FORMATS, default="json",
+                        help="Index format: json (default) or a packed f32/f16/int8 vector blob "
+                             "with a .meta.json sidecar.")
+    parser.add_argument("--dimensions", type=int, default=None,
+                        help="Request a reduced output dimensionality (e.g. 256 or 768; "
+                             f"default {EMBED_DIMENSIONS}, or {HASHED_DIMENSIONS} for --backend hashed).")
+    parser.add_argument("--normalize", action="store_true",
+                        help="Store unit-length vectors so retrieval can use a plain dot product.")
+    parser.add_argument("--ann", choices=["ivf"], default=None,
+                        help="Also build an approximate nearest-neighbour structure "
+                             "(<output>.ivf.json; requires NumPy).")
+    parser.add_argument("--ann-lists", type=int, default=None,
+                        help="Number of IVF lists (default: sqrt of the chunk count).")
+    parser.add_argument("--ann-probe", type=int, default=None,
+                        help="Lists scanned per query by default (default: a quarter of the lists).")
+    parser.add_argument("--no-lexical", action="store_true",
+                        help="Do not store the BM25 inverted index (lexical section) in the index.")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep near-duplicate chunks (MinHash over chunk text is on by default).")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="Estimated Jaccard similarity at which a chunk counts as a duplicate.")
+    parser.add_argument("--dedup-cosine", type=float, default=None,
+                        help="Also drop chunks whose embedding is this cosine-close to a kept one "
+                             "(e.g. 0.98; requires NumPy).")
+    parser.add_argument("--queries", default=None, metavar="FILE",
+                        help="Anticipated queries, one per line, whose top-k chunks are precomputed "
+                             "into the index (e.g. worker/anticipated_queries.txt).")
+    parser.add_argument("--queries-k", type=int, default=4,
+                        help="Chunks stored per anticipated query (match the Worker's TOP_K).")
+    parser.add_argument("--sources", nargs="+", choices=[name for name, _ in SOURCES], default=None,
+                        help="Only index these content sources (default: all).")
+    parser.add_argument("--chunk-tokens", type=int, default=256,
+                        help="Maximum tokens per chunk.")
+    parser.add_argument("--chunk-overlap", type=int, default=32,
+                        help="Tokens shared by consecutive chunks of the same document.")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="Embedding cache file (JSON Lines).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-embed every chunk and leave the cache untouched.")
+    parser.add_argument("--cache-max-age-days", type=float, default=30,
+                        help="Evict cache entries unused by this build after this many days.")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
+
+def batched(items, size):
+    """Yield lists of up to ``size`` items from any iterable."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def make_client(args):
+    if args.backend == "hashed":
+        return make_backend("hashed", HASHED_DIMENSIONS if args.dimensions is None else args.dimensions)
+    if not GEMINI_API_KEY:
+        print("ERROR: Set GEMINI_API_KEY environment variable (or use --backend hashed).", file=sys.stderr)
+        print("  export GEMINI_API_KEY='your-key-here'", file=sys.stderr)
+        sys.exit(1)
+    return make_backend(
+        "gemini",
+        args.dimensions,
+        GEMINI_API_KEY,
+        model=EMBED_MODEL,
+        api_base=args.api_base,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        requests_per_minute=args.rpm,
     )
 
+
+def embed_chunks(chunks, args, cache, cache_model, stats):
+    """Yield ``(chunk, embedding)`` pairs, embedding cache misses one window at a time.
+
+    A window holds enough chunks to keep every worker busy, so memory is
+    bounded by the window rather than the corpus.
+    """
+    client = None
+    window = max(1, args.batch_size) * max(1, args.workers)
     try:
-        with urllib.request.urlopen(req) as resp:
-            result = json.loads(resp.read().decode("utf-8"))
-            return result["embedding"]["values"]
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8") if e.fp else ""
-        print(f"  ERROR embedding text: {e.code} {body[:200]}", file=sys.stderr)
-        return None
+        for window_chunks in batched(chunks, window):
+            with instrumentation.stage("cache"):
+                embeddings = [
+                    cache.get(cache_model, chunk["text"]) if cache is not None else None
+                    for chunk in window_chunks
+                ]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                if client is None:
+                    client = make_client(args)
+                missing_texts = [window_chunks[i]["text"] for i in missing]
+                with instrumentation.stage("embed"):
+                    fresh = client.embed_many(missing_texts)
+                for i, embedding in zip(missing, fresh):
+                    embeddings[i] = embedding
+                if cache is not None:
+                    with instrumentation.stage("cache"):
+                        cache.put_many(cache_model, zip(missing_texts, fresh))
+                stats["embedded"] += len(missing)
+
+            stats["chunks"] += len(window_chunks)
+            via = "locally" if args.backend == "hashed" else "via API"
+            print(f"  [{stats['chunks']}] chunks processed ({stats['embedded']} embedded {via})")
+            yield from zip(window_chunks, embeddings)
+    finally:
+        if client is not None:
+            client.close()
+
+
+def index_entries(pairs, args, stats):
+    """Turn ``(chunk, embedding)`` pairs into index records, dropping failures."""
+    for chunk, embedding in pairs:
+        if not embedding:
+            stats["skipped"] += 1
+            print(f"  Skipped {chunk['id']} (embedding failed)")
+            continue
+        if args.normalize:
+            embedding = normalize(embedding)
+        yield {
+            "id": chunk["id"],
+            "title": chunk["title"],
+            "text": chunk["text"],
+            "source": chunk["source"],
+            "embedding": embedding,
+        }
+
+
+def build(args):
+    metrics = instrumentation.current()
+    default_dimensions = HASHED_DIMENSIONS if args.backend == "hashed" else EMBED_DIMENSIONS
+    dimensions = default_dimensions if args.dimensions is None else args.dimensions
+    if dimensions <= 0 or (args.backend == "gemini" and dimensions > EMBED_DIMENSIONS):
+        limit = f"between 1 and {EMBED_DIMENSIONS}" if args.backend == "gemini" else "at least 1"
+        print(f"ERROR: --dimensions must be {limit}.", file=sys.stderr)
+        sys.exit(1)
+    model = HashedNgramBackend(dimensions).model if args.backend == "hashed" else EMBED_MODEL
+    # Reduced-dimension vectors differ from truncated full ones, so they get their own cache key.
+    cache_model = EMBED_MODEL if dimensions == EMBED_DIMENSIONS else f"{EMBED_MODEL}@{dimensions}"
+
+    with instrumentation.stage("cache"):
+        # Local vectors are cheaper to recompute than to look up.
+        use_cache = not args.no_cache and args.backend == "gemini"
+        cache = EmbeddingCache(args.cache, max_age_days=args.cache_max_age_days) if use_cache else None
+    stats = {"chunks": 0, "embedded": 0, "skipped": 0}
+    metadata = {"backend": args.backend, "model": model, "dim": dimensions, "normalized": args.normalize}
+
+    anticipated = None
+    if args.queries:
+        queries = read_queries(args.queries)
+        print(f"Embedding {len(queries)} anticipated queries from {args.queries}...")
+        query_stats = {"chunks": 0, "embedded": 0, "skipped": 0}
+        with instrumentation.stage("queries"):
+            query_chunks = ({"text": query} for query in queries)
+            query_pairs = list(embed_chunks(query_chunks, args, cache, cache_model, query_stats))
+        anticipated = AnticipatedQueries(queries, [vector for _, vector in query_pairs], k=args.queries_k)
+
+    print("Streaming chunks through extraction, embedding and the index writer...")
+    chunks = metrics.timed_iter("extract", iter_chunks(args.sources, Chunker(args.chunk_tokens, args.chunk_overlap)))
+    duplicates = Duplicates()
+    text_dedup = None
+    if not args.no_dedup:
+        text_dedup = MinHashDeduper(args.dedup_threshold, duplicates=duplicates)
+        chunks = metrics.timed_iter("dedup", text_dedup.filter(chunks))
+    pairs = embed_chunks(chunks, args, cache, cache_model, stats)
+    entries = index_entries(pairs, args, stats)
+    if args.dedup_cosine:
+        entries = metrics.timed_iter("dedup", CosineDeduper(args.dedup_cosine, duplicates).filter(entries))
+    lexical = None if args.no_lexical else Bm25Builder()
+    with IndexWriter(args.output, args.format, metadata) as writer:
+        for entry in entries:
+            with instrumentation.stage("write"):
+                writer.add(entry)
+            if lexical is not None:
+                with instrumentation.stage("lexical"):
+                    lexical.add(f"{entry['title']} {entry['text']}")
+            if anticipated is not None:
+                with instrumentation.stage("queries"):
+                    anticipated.add(entry["id"], entry["embedding"])
+        if lexical is not None:
+            writer.metadata["lexical"] = lexical.to_json()
+        if anticipated is not None:
+            writer.metadata["anticipated"] = anticipated.to_json()
+        if duplicates.by_kept:
+            writer.metadata["duplicates"] = duplicates.by_kept
+        with instrumentation.stage("write"):
+            written = writer.close()
+    metrics.set("chunks", stats)
+    seen = text_dedup.seen if text_dedup is not None else stats["chunks"]
+    dedup_report = duplicates.report(seen)
+    metrics.set("dedup", dedup_report)
+    metrics.set("index_bytes", sum(os.path.getsize(path) for path in written))
+
+    if cache is not None:
+        with instrumentation.stage("cache"):
+            cache.save()
+        report = cache.report()
+        metrics.set("cache", report)
+        print(
+            f"  Cache report: {report['hits']} hits, {report['misses']} misses "
+            f"({report['hit_rate']:.0%} hit rate), {report['evicted']} evicted, "
+            f"{report['entries']} entries"
+        )
+
+    print(f"\nDone! Wrote {writer.count} entries to {', '.join(written)}")
+    print(
+        f"  Dedup: removed {dedup_report['removed']} of {dedup_report['seen']} chunks "
+        f"({dedup_report['removed_fraction']:.1%}, {dedup_report['removed_chars']} chars) {dedup_report['by_stage']}"
+    )
+    if anticipated is not None:
+        print(f"  Anticipated queries: {len(anticipated)} precomputed (top {anticipated.k})")
+    print(f"  Index size: {sum(os.path.getsize(path) for path in written) / 1024:.1f} KB")
+
+    if args.ann and writer.count:
+        with instrumentation.stage("ann"):
+            build_ann(args, written[-1])
 
 
 def main():
-    if not GEMINI_API_KEY:
-        print("ERROR: Set GEMINI_API_KEY environment variable.", file=sys.stderr)
-        print("  export GEMINI_API_KEY='your-key-here'", file=sys.stderr)
-        sys.exit(1)
+    args = parse_args()
+    with instrumentation.session("build_rag_index", args.report, args.profile):
+        build(args)
+
+
+def build_ann(args, index_path):
+    """Build and save the IVF structure, then report its recall against brute force."""
+    from rag_ann import IvfIndex, ann_path, recall_report
+    from rag_retrieval import RagIndex
+
+    index = RagIndex.load(index_path)
+    ivf = IvfIndex.build(index.matrix, n_lists=args.ann_lists, n_probe=args.ann_probe, ids=index.ids)
+    path = ann_path(args.output)
+    ivf.save(path)
 
-    print("Extracting content chunks...")
-    chunks = extract_chunks()
-    print(f"  Found {len(chunks)} chunks")
-
-    print("Generating embeddings via Gemini...")
-    index_entries = []
-    for i, chunk in enumerate(chunks):
-        label = chunk["title"][:50]
-        print(f"  [{i + 1}/{len(chunks)}] {label}...")
-        embedding = get_embedding(chunk["text"])
-        if embedding:
-            index_entries.append({
-                "id": chunk["id"],
-                "title": chunk["title"],
-                "text": chunk["text"],
-                "source": chunk["source"],
-                "embedding": embedding,
-            })
-        else:
-            print(f"    Skipped (embedding failed)")
-
-    output_path = os.path.join(ROOT, "worker", "src", "rag_index.json")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump({"chunks": index_entries, "model": EMBED_MODEL}, f)
-
-    print(f"\nDone! Wrote {len(index_entries)} entries to {output_path}")
-    print(f"  Index size: {os.path.getsize(output_path) / 1024:.1f} KB")
+    row = next(r for r in recall_report(index, ivf) if r["n_probe"] == ivf.n_probe)
+    print(f"  ANN: {len(ivf.centroids)} IVF lists, n_probe={ivf.n_probe} -> {path}")
+    print(f"  ANN recall@4 vs brute force: {row['recall']:.3f}, scanning {row['scanned_fraction']:.0%} of chunks")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+"""Token-aware text chunking shared by every RAG content source.
+
+Text is tokenized once with a single regex pass (words and punctuation,
+a close, dependency-free approximation of the embedding model's subword
+tokens).  Chunks are then cut greedily at ``max_tokens``, backing off to the
+last sentence boundary when one falls in the second half of the window, and
+consecutive chunks share ``overlap`` tokens.  Chunk text is sliced straight
+out of the source string, so splitting is linear in the input length.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterator, List, Tuple
+
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = frozenset(".!?")
+
+FRONT_MATTER_RE = re.compile(r"^---.*?---", re.DOTALL)
+HEADING_RE = re.compile(r"#+ ")
+LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def clean_markdown(text: str) -> str:
+    """Drop front matter, heading markers and link targets; collapse whitespace."""
+    text = FRONT_MATTER_RE.sub("", text.lstrip(), count=1)
+    text = HEADING_RE.sub("", text)
+    text = LINK_RE.sub(r"\1", text)
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in TOKEN_RE.finditer(text))
+
+
+class Chunker:
+    """Split text into token-bounded, overlapping chunks."""
+
+    def __init__(self, max_tokens: int = 256, overlap: int = 32) -> None:
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be between 0 and max_tokens - 1")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """Character ``(start, end)`` spans of each chunk of ``text``."""
+        tokens = [(m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+        n = len(tokens)
+        if not n:
+            return []
+        if n <= self.max_tokens:
+            return [(tokens[0][0], tokens[-1][1])]
+
+        # last_boundary[i]: largest j <= i such that a sentence ends right before token j.
+        last_boundary = [0] * (n + 1)
+        for i in range(1, n + 1):
+            ends_sentence = text[tokens[i - 1][0]] in SENTENCE_END
+            last_boundary[i] = i if ends_sentence else last_boundary[i - 1]
+
+        spans = []
+        start = 0
+        while start < n:
+            end = min(start + self.max_tokens, n)
+            if end < n:
+                boundary = last_boundary[end]
+                if boundary > start + self.max_tokens // 2:
+                    end = boundary
+            spans.append((tokens[start][0], tokens[end - 1][1]))
+            if end >= n:
+                break
+            start = max(end - self.overlap, start + 1)
+        return spans
+
+    def split(self, text: str) -> List[str]:
+        return [text[a:b] for a, b in self.spans(text)]
+
+    def chunks(self, base_id: str, source: str, title: str, text: str) -> Iterator[dict]:
+        """Yield index chunks for one document.
+
+        A document that fits in one chunk keeps ``base_id``; longer ones get
+        ``base_id-0``, ``base_id-1``, ...
+        """
+        pieces = self.split(text)
+        for i, piece in enumerate(pieces):
+            yield {
+                "id": base_id if len(pieces) == 1 else f"{base_id}-{i}",
+                "source": source,
+                "title": title,
+                "text": piece,
+            }
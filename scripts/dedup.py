@@ -0,0 +1,152 @@
+"""Near-duplicate removal for RAG chunks.
+
+The same content often reaches the index more than once: a paper listed in
+``papers.json`` and described in a post, boilerplate repeated across
+``_posts/``, the status text that is also on the home page.  Each copy costs
+an embedding call, index bytes and a top-k slot.
+
+:class:`MinHashDeduper` runs on chunk text before embedding.  Each chunk is
+reduced to a MinHash signature over word 5-gram shingles; locality-sensitive
+banding finds candidate pairs in constant time per chunk, and a candidate
+whose estimated Jaccard similarity reaches ``threshold`` is dropped in favour
+of the first copy seen.  :class:`CosineDeduper` optionally does the same on
+the embeddings (requires NumPy).  Dropped chunks are recorded against the
+chunk they duplicate, so the index keeps their source attribution.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+WORD_RE = re.compile(r"\w+")
+MASK64 = (1 << 64) - 1
+
+
+class Duplicates:
+    """Which chunks were dropped, and in favour of which kept chunk."""
+
+    def __init__(self) -> None:
+        self.by_kept: Dict[str, List[Dict[str, str]]] = {}
+        self.removed = 0
+        self.removed_chars = 0
+        self.by_stage: Dict[str, int] = {}
+
+    def record(self, stage: str, kept_id: str, dropped: dict, similarity: float) -> None:
+        self.by_kept.setdefault(kept_id, []).append({
+            "id": dropped["id"],
+            "source": dropped["source"],
+            "similarity": round(similarity, 3),
+        })
+        self.removed += 1
+        self.removed_chars += len(dropped.get("text", ""))
+        self.by_stage[stage] = self.by_stage.get(stage, 0) + 1
+
+    def report(self, total: int) -> Dict[str, object]:
+        return {
+            "seen": total,
+            "removed": self.removed,
+            "removed_fraction": round(self.removed / total, 4) if total else 0.0,
+            "removed_chars": self.removed_chars,
+            "by_stage": dict(self.by_stage),
+        }
+
+
+class MinHashDeduper:
+    """Streaming MinHash/LSH filter over chunk text."""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle: int = 5, duplicates: Optional[Duplicates] = None, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.duplicates = duplicates or Duplicates()
+        self.seen = 0
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+        self._buckets: List[Dict[tuple, str]] = [{} for _ in range(bands)]
+        self._signatures: Dict[str, List[int]] = {}
+
+    def signature(self, text: str) -> List[int]:
+        words = WORD_RE.findall(text.lower())
+        size = min(self.shingle, len(words)) or 1
+        hashes = {
+            int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=8).digest(), "little")
+            for i in range(max(1, len(words) - size + 1))
+        }
+        return [min(h ^ mask for h in hashes) for mask in self._masks]
+
+    @staticmethod
+    def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def check(self, chunk: dict) -> Optional[str]:
+        """Return the id of a kept near-duplicate of ``chunk``, or register it and return None."""
+        self.seen += 1
+        signature = self.signature(chunk["text"])
+        keys = [tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+        best_id, best = None, 0.0
+        for band, key in enumerate(keys):
+            candidate = self._buckets[band].get(key)
+            if candidate is not None and candidate != best_id:
+                score = self.similarity(signature, self._signatures[candidate])
+                if score > best:
+                    best_id, best = candidate, score
+        if best_id is not None and best >= self.threshold:
+            self.duplicates.record("minhash", best_id, chunk, best)
+            return best_id
+        self._signatures[chunk["id"]] = signature
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, chunk["id"])
+        return None
+
+    def filter(self, chunks: Iterable[dict]) -> Iterator[dict]:
+        for chunk in chunks:
+            if self.check(chunk) is None:
+                yield chunk
+
+
+class CosineDeduper:
+    """Drop entries whose embedding is within ``threshold`` cosine of one already kept (requires NumPy)."""
+
+    def __init__(self, threshold: float = 0.98, duplicates: Optional[Duplicates] = None) -> None:
+        import numpy as np
+
+        self._np = np
+        self.threshold = threshold
+        self.duplicates = duplicates or Duplicates()
+        self._ids: List[str] = []
+        self._matrix = None
+
+    def check(self, entry: dict) -> Optional[str]:
+        np = self._np
+        vector = np.asarray(entry["embedding"], dtype=np.float32)
+        norm = float(np.linalg.norm(vector)) or 1.0
+        vector /= norm
+        count = len(self._ids)
+        if count:
+            scores = self._matrix[:count] @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.duplicates.record("cosine", self._ids[best], entry, float(scores[best]))
+                return self._ids[best]
+        if self._matrix is None:
+            self._matrix = np.empty((64, len(vector)), dtype=np.float32)
+        elif count == len(self._matrix):
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+        self._matrix[count] = vector
+        self._ids.append(entry["id"])
+        return None
+
+    def filter(self, entries: Iterable[dict]) -> Iterator[dict]:
+        for entry in entries:
+            if self.check(entry) is None:
+                yield entry
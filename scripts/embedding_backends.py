@@ -0,0 +1,157 @@
+"""Embedding backends for the RAG index.
+
+A backend turns texts into vectors.  Every backend provides
+
+* ``name`` -- short identifier stored in the index metadata (``backend``);
+* ``model`` -- the model (or local scheme) it embeds with;
+* ``dim`` -- the dimension of the vectors it returns;
+* ``cacheable`` -- whether results are worth keeping in the embedding cache;
+* ``embed_many(texts, progress=None)`` -- one vector (or ``None`` on
+  failure) per text, in input order;
+* ``close()`` and context-manager support.
+
+``gemini`` is :class:`embedding_client.EmbeddingClient`.  ``hashed`` is
+:class:`HashedNgramBackend`, a local, deterministic bag of hashed character
+n-grams that needs no network or API key, so the index can be built, tested
+and benchmarked anywhere.  Its vectors are only comparable with other
+``hashed`` vectors of the same parameters; :func:`check_compatible` compares
+an index's metadata with the backend about to embed its queries.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+BACKENDS = ("gemini", "hashed")
+DEFAULT_BACKEND = "gemini"
+HASHED_DIMENSIONS = 256
+# Odd 64-bit multipliers for the n-gram hash (bucket) and its sign.
+_BUCKET_MULTIPLIER = 0x9E3779B97F4A7C15
+_SIGN_MULTIPLIER = 0xC2B2AE3D27D4EB4F
+
+
+class HashedNgramBackend:
+    """Signed feature hashing of character n-grams, vectorized with NumPy.
+
+    The batch is lower-cased, UTF-8 encoded and concatenated; every n-gram
+    (``min_n``..``max_n`` bytes) is packed into an integer, hashed into one of
+    ``dim`` buckets with a +/-1 sign, and the counts of each text are summed
+    with a single ``bincount`` before L2 normalisation.  No Python-level loop
+    runs per n-gram, so thousands of chunks embed per second.
+    """
+
+    name = "hashed"
+    cacheable = False
+
+    def __init__(self, dim: int = HASHED_DIMENSIONS, min_n: int = 3, max_n: int = 5, batch_size: int = 512) -> None:
+        import numpy as np
+
+        if not 1 <= min_n <= max_n <= 7:
+            raise ValueError("n-gram sizes must satisfy 1 <= min_n <= max_n <= 7")
+        self._np = np
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+        self.batch_size = max(1, batch_size)
+        self.model = f"hashed-char-{min_n}-{max_n}gram"
+
+    def _embed_batch(self, texts: Sequence[str]):
+        np = self._np
+        encoded = [text.lower().encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        owner = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+        counts = np.zeros(len(encoded) * self.dim, dtype=np.float64)
+
+        with np.errstate(over="ignore"):
+            for n in range(self.min_n, self.max_n + 1):
+                if len(data) < n:
+                    break
+                starts = len(data) - n + 1
+                # Keep only n-grams that start and end inside the same text.
+                same_text = owner[:starts] == owner[n - 1:]
+                packed = np.full(starts, n, dtype=np.uint64)
+                for offset in range(n):
+                    packed = (packed << np.uint64(8)) | data[offset:offset + starts]
+                packed = packed[same_text]
+                buckets = ((packed * np.uint64(_BUCKET_MULTIPLIER)) >> np.uint64(40)) % np.uint64(self.dim)
+                signs = np.where((packed * np.uint64(_SIGN_MULTIPLIER)) >> np.uint64(63), -1.0, 1.0)
+                counts += np.bincount(
+                    owner[:starts][same_text] * self.dim + buckets.astype(np.int64),
+                    weights=signs,
+                    minlength=len(counts),
+                )
+
+        matrix = counts.reshape(len(encoded), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    def embed_many(
+        self,
+        texts: Sequence[str],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Optional[List[float]]]:
+        results: List[Optional[List[float]]] = []
+        for start in range(0, len(texts), self.batch_size):
+            results.extend(self._embed_batch(texts[start:start + self.batch_size]).tolist())
+            if progress is not None:
+                progress(len(results), len(texts))
+        return results
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "HashedNgramBackend":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def make_backend(
+    name: str,
+    dim: Optional[int] = None,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    **gemini_options,
+):
+    """Construct a backend by name; ``gemini_options`` go to :class:`EmbeddingClient`."""
+    if name == "hashed":
+        return HashedNgramBackend(dim or HASHED_DIMENSIONS)
+    if name == "gemini":
+        from embedding_client import EmbeddingClient
+
+        api_key = api_key if api_key is not None else os.environ.get("GEMINI_API_KEY", "")
+        if not api_key:
+            raise ValueError("the gemini backend needs GEMINI_API_KEY")
+        options = dict(gemini_options, output_dimensionality=dim)
+        if model:
+            options["model"] = model
+        return EmbeddingClient(api_key, **options)
+    raise ValueError(f"Unknown embedding backend: {name!r} (choose from {', '.join(BACKENDS)})")
+
+
+def backend_for_index(meta: Dict, api_key: Optional[str] = None, **gemini_options):
+    """The backend whose query vectors are comparable with an index's chunk vectors."""
+    name = meta.get("backend", DEFAULT_BACKEND)
+    dim = meta.get("dim")
+    if name == "gemini":
+        return make_backend(name, dim, api_key, model=meta.get("model"), **gemini_options)
+    backend = make_backend(name, dim)
+    check_compatible(meta, backend)
+    return backend
+
+
+def check_compatible(meta: Dict, backend) -> None:
+    """Raise ValueError when ``backend`` would embed queries unlike the index's chunks."""
+    expected = (meta.get("backend", DEFAULT_BACKEND), meta.get("model"), meta.get("dim"))
+    actual = (backend.name, backend.model, getattr(backend, "dim", None) or meta.get("dim"))
+    if expected != actual:
+        raise ValueError(
+            "Index was built with backend={}, model={}, dim={} but queries would use backend={}, model={}, dim={}".format(
+                *expected, *actual
+            )
+        )
@@ -0,0 +1,122 @@
+"""Persistent on-disk cache of chunk embeddings.
+
+Entries are keyed by ``(model, sha256(text))`` so a rebuild only pays for
+chunks whose text actually changed.  The cache is an append-only JSON Lines
+file: new embeddings are appended (and flushed) as soon as they arrive, so an
+interrupted build keeps its progress, and :meth:`EmbeddingCache.save`
+rewrites the file compactly at the end of a run.
+
+Eviction is mark-and-sweep: every lookup marks an entry as used, and on save
+entries that were not referenced by this build *and* have not been used for
+``max_age_days`` are dropped.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+CacheKey = Tuple[str, str]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Lookup/store embeddings and keep hit/miss statistics."""
+
+    def __init__(self, path: str, max_age_days: float = 30.0) -> None:
+        self.path = path
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries: Dict[CacheKey, dict] = {}
+        self._referenced: Set[CacheKey] = set()
+        self._log = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted run; everything before it is valid.
+                    continue
+                self._entries[(entry["model"], entry["hash"])] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = (model, text_hash(text))
+        self._referenced.add(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry["used"] = time.time()
+        return entry["values"]
+
+    def put(self, model: str, text: str, values: List[float]) -> None:
+        key = (model, text_hash(text))
+        self._referenced.add(key)
+        entry = {"model": model, "hash": key[1], "used": time.time(), "values": values}
+        self._entries[key] = entry
+        if self._log is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._log = open(self.path, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, Optional[List[float]]]]) -> None:
+        for text, values in items:
+            if values:
+                self.put(model, text, values)
+
+    def evict_unreferenced(self) -> int:
+        """Drop entries unused by this build and older than ``max_age_days``."""
+        cutoff = time.time() - self.max_age_days * 86400
+        stale = [
+            key for key, entry in self._entries.items()
+            if key not in self._referenced and entry.get("used", 0) < cutoff
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.evicted += len(stale)
+        return len(stale)
+
+    def save(self) -> None:
+        """Evict stale entries and rewrite the log compactly."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.evict_unreferenced()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def report(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evicted": self.evicted,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,126 @@
+"""Batched, concurrent client for the Gemini embedding API.
+
+Texts are grouped into ``batchEmbedContents`` requests (up to 100 texts per
+call, the API limit) and the batches are sent from a bounded thread pool.
+Every worker thread reuses its own keep-alive connection through
+:class:`http_session.HttpSession`, 429/5xx responses are retried with
+backoff, and all workers share one requests-per-minute budget.
+
+Point ``api_base`` (or ``GEMINI_API_BASE``) at a local stand-in server to
+exercise the client without touching the real API.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from http_session import HttpError, HttpSession, RateLimiter
+
+
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+MAX_BATCH_SIZE = 100
+
+
+class EmbeddingClient:
+    """Embed many texts with few requests.
+
+    ``embed_many`` returns one entry per input text, in input order; entries
+    are ``None`` for texts whose batch failed permanently.
+    """
+
+    name = "gemini"
+    cacheable = True
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "models/gemini-embedding-001",
+        api_base: Optional[str] = None,
+        batch_size: int = 50,
+        workers: int = 4,
+        requests_per_minute: float = 0.0,
+        timeout: float = 60.0,
+        max_retries: int = 5,
+        output_dimensionality: Optional[int] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.model = model
+        self.output_dimensionality = output_dimensionality
+        self.dim = output_dimensionality
+        self.api_base = (api_base or os.environ.get("GEMINI_API_BASE") or DEFAULT_API_BASE).rstrip("/")
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.workers = max(1, workers)
+        self.session = HttpSession(
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limiter=RateLimiter(requests_per_minute),
+            headers={"Content-Type": "application/json", "x-goog-api-key": api_key},
+        )
+        # One long-lived pool: the session keeps a connection per thread, so
+        # reusing the threads across embed_many calls reuses the connections.
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    @property
+    def batch_url(self) -> str:
+        return f"{self.api_base}/{self.model}:batchEmbedContents"
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> "EmbeddingClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _request_body(self, text: str) -> dict:
+        body = {"model": self.model, "content": {"parts": [{"text": text}]}}
+        if self.output_dimensionality:
+            body["outputDimensionality"] = self.output_dimensionality
+        return body
+
+    def embed_batch(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embed one batch with a single ``batchEmbedContents`` call."""
+        payload = json.dumps({"requests": [self._request_body(text) for text in texts]}).encode("utf-8")
+        try:
+            response = self.session.post(self.batch_url, payload)
+        except (HttpError, OSError) as error:
+            print(f"  ERROR embedding batch of {len(texts)}: {error}", file=sys.stderr)
+            return [None] * len(texts)
+
+        embeddings = json.loads(response.text()).get("embeddings", [])
+        if len(embeddings) != len(texts):
+            print(
+                f"  ERROR embedding batch: expected {len(texts)} vectors, got {len(embeddings)}",
+                file=sys.stderr,
+            )
+            return [None] * len(texts)
+        return [item.get("values") for item in embeddings]
+
+    def _batches(self, texts: Sequence[str]) -> Iterator[Sequence[str]]:
+        for start in range(0, len(texts), self.batch_size):
+            yield texts[start:start + self.batch_size]
+
+    def embed_many(
+        self,
+        texts: Sequence[str],
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Optional[List[float]]]:
+        """Embed ``texts`` concurrently, preserving order.
+
+        ``progress(done, total)`` is called after every completed batch.
+        """
+        results: List[Optional[List[float]]] = []
+        done = 0
+        # ``map`` yields in submission order, so results line up with ``texts``.
+        for batch_result in self._pool.map(self.embed_batch, self._batches(texts)):
+            results.extend(batch_result)
+            done += len(batch_result)
+            if progress is not None:
+                progress(done, len(texts))
+        return results
@@ -1,49 +1,139 @@
 #!/usr/bin/env python3
-"""Fetch the latest publications from Google Scholar and store them as JSON."""
+"""Fetch the latest publications from Google Scholar and store them as JSON.
+
+Filled publications are cached per Scholar publication id.  An entry is only
+re-filled when its citation count in the author listing changed or it is
+older than ``--max-age-days``; those fills run on a small thread pool behind
+a shared rate limiter, so a nightly sync costs what changed rather than the
+author's whole output.  The result is written minified with a content-hashed,
+precompressed copy listed in ``assets/data/manifest.json`` (see :mod:`artifacts`).
+"""
 
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import sys
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from scholarly import scholarly
 
+import artifacts
+import instrumentation
+from http_session import RateLimiter
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = REPO_ROOT / "assets" / "data" / "papers.json"
 AUTHOR_ID_ENV = "SCHOLAR_AUTHOR_ID"
 MAX_PAPERS = int(os.getenv("SCHOLAR_MAX_PAPERS", "25"))
+CACHE_PATH = REPO_ROOT / ".cache" / "scholar_publications.json"
+
+
+class PublicationCache:
+  """Filled entries keyed by Scholar publication id, with the citation count they were filled at."""
+
+  def __init__(self, path: Optional[Path], max_age_days: float = 30) -> None:
+    self.path = path
+    self.max_age = timedelta(days=max_age_days)
+    self.entries: Dict[str, Dict[str, Any]] = {}
+    self.dirty = False
+    if path is not None and path.exists():
+      try:
+        self.entries = json.loads(path.read_text(encoding="utf-8"))
+      except ValueError:
+        print(f"Ignoring unreadable publication cache {path}", file=sys.stderr)
+
+  def get(self, pub_id: str, num_citations: Any) -> Optional[Dict[str, Any]]:
+    """The cached entry, or None when missing, older than max age or cited a different number of times."""
+    cached = self.entries.get(pub_id)
+    if not cached or cached.get("num_citations") != num_citations:
+      return None
+    try:
+      filled_at = datetime.fromisoformat(cached["filled_at"])
+    except (KeyError, ValueError):
+      return None
+    if datetime.now(timezone.utc) - filled_at > self.max_age:
+      return None
+    return cached["entry"]
+
+  def put(self, pub_id: str, num_citations: Any, entry: Dict[str, Any]) -> None:
+    self.entries[pub_id] = {
+      "num_citations": num_citations,
+      "filled_at": datetime.now(timezone.utc).isoformat(),
+      "entry": entry,
+    }
+    self.dirty = True
+
+  def save(self) -> None:
+    if self.path is None or not self.dirty:
+      return
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = self.path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(self.entries, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    os.replace(tmp_path, self.path)
+    self.dirty = False
+
+
+def publication_id(publication: Dict[str, Any]) -> str:
+  return publication.get("author_pub_id") or publication.get("bib", {}).get("title", "")
+
+
+def to_entry(filled: Dict[str, Any]) -> Dict[str, Any]:
+  bib = filled.get("bib", {})
+  return {
+    "title": bib.get("title", "Untitled"),
+    "authors": bib.get("author"),
+    "venue": bib.get("venue") or bib.get("journal") or bib.get("publisher"),
+    "year": safe_int(bib.get("pub_year")),
+    "link": filled.get("pub_url") or filled.get("eprint_url"),
+    "cited_by": filled.get("num_citations"),
+  }
 
 
-def fetch_publications(author_id: str) -> List[Dict[str, Any]]:
+def fetch_publications(
+  author_id: str,
+  cache: Optional[PublicationCache] = None,
+  workers: int = 4,
+  limiter: Optional[RateLimiter] = None,
+) -> List[Dict[str, Any]]:
   """Return a list of publication dictionaries for the author."""
-  author = scholarly.search_author_id(author_id)
-  author = scholarly.fill(author, sections=["publications"])
-
-  publications: List[Dict[str, Any]] = []
-
-  for publication in author.get("publications", [])[:MAX_PAPERS]:
+  cache = cache or PublicationCache(None)
+  limiter = limiter or RateLimiter()
+  with instrumentation.stage("author"):
+    author = scholarly.search_author_id(author_id)
+    author = scholarly.fill(author, sections=["publications"])
+
+  listed = author.get("publications", [])[:MAX_PAPERS]
+  entries: List[Optional[Dict[str, Any]]] = [
+    cache.get(publication_id(publication), publication.get("num_citations")) for publication in listed
+  ]
+  stale = [i for i, entry in enumerate(entries) if entry is None]
+  instrumentation.current().count("cache_hits", len(listed) - len(stale))
+
+  def fill(publication: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    limiter.acquire()
     try:
-      filled = scholarly.fill(publication)
+      with instrumentation.stage("fill"):
+        return scholarly.fill(publication)
     except Exception as error:  # pylint: disable=broad-except
       print(f"Skipping publication due to error: {error}", file=sys.stderr)
-      continue
-
-    bib = filled.get("bib", {})
-    entry = {
-      "title": bib.get("title", "Untitled"),
-      "authors": bib.get("author"),
-      "venue": bib.get("venue") or bib.get("journal") or bib.get("publisher"),
-      "year": safe_int(bib.get("pub_year")),
-      "link": filled.get("pub_url") or filled.get("eprint_url"),
-      "cited_by": filled.get("num_citations"),
-    }
-
-    publications.append(entry)
-
+      instrumentation.current().count("fill_errors")
+      return None
+
+  if stale:
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(stale)))) as pool:
+      for i, filled in zip(stale, pool.map(fill, [listed[i] for i in stale])):
+        if filled is None:
+          continue
+        instrumentation.current().count("filled")
+        entries[i] = to_entry(filled)
+        cache.put(publication_id(listed[i]), listed[i].get("num_citations"), entries[i])
+
+  publications = [entry for entry in entries if entry is not None]
   publications.sort(key=lambda item: item.get("year") or 0, reverse=True)
   return publications
 
@@ -55,6 +145,10 @@ def safe_int(value: Any) -> int | None:
     return None
 
 
+def without_timestamp(payload: Dict[str, Any]) -> Dict[str, Any]:
+  return {key: value for key, value in payload.items() if key != "last_updated"}
+
+
 def write_payload(papers: List[Dict[str, Any]]) -> None:
   payload = {
     "last_updated": datetime.now(timezone.utc).isoformat(),
@@ -62,18 +156,45 @@ def write_payload(papers: List[Dict[str, Any]]) -> None:
     "papers": papers,
   }
 
-  DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-  DATA_PATH.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-  print(f"Wrote {len(papers)} papers to {DATA_PATH}")
+  try:
+    existing = json.loads(DATA_PATH.read_text(encoding="utf-8"))
+  except (OSError, ValueError):
+    existing = {}
+  if without_timestamp(existing) == without_timestamp(payload):
+    # Only the timestamp would change: keep the file, hashed copy and manifest as they are.
+    with instrumentation.stage("serialize"):
+      artifacts.publish(DATA_PATH, existing, logical=False)
+    print(f"{DATA_PATH} is up to date ({len(papers)} papers); not rewriting")
+    return
+
+  with instrumentation.stage("serialize"):
+    entry = artifacts.publish(DATA_PATH, payload)
+  print(f"Wrote {len(papers)} papers to {DATA_PATH} ({entry['file']}, {entry['gzip_bytes']} bytes gzipped)")
 
 
 def main() -> int:
+  parser = argparse.ArgumentParser(description=f"Sync {DATA_PATH.name} from Google Scholar (author id from ${AUTHOR_ID_ENV}).")
+  parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Per-publication cache (default: .cache/scholar_publications.json).")
+  parser.add_argument("--no-cache", action="store_true", help="Re-fill every publication.")
+  parser.add_argument("--max-age-days", type=float, default=30, help="Re-fill cached publications older than this.")
+  parser.add_argument("--workers", type=int, default=4, help="Concurrent publication fills.")
+  parser.add_argument("--rpm", type=float, default=30, help="Maximum fills per minute against Scholar (0 = unlimited).")
+  instrumentation.add_arguments(parser)
+  args = parser.parse_args()
+
+  with instrumentation.session("fetch_scholar", args.report, args.profile):
+    return run(args)
+
+
+def run(args: argparse.Namespace) -> int:
   author_id = os.getenv(AUTHOR_ID_ENV)
   if not author_id:
     print(f"Environment variable {AUTHOR_ID_ENV} is required", file=sys.stderr)
     return 1
 
-  papers = fetch_publications(author_id)
+  cache = PublicationCache(None if args.no_cache else args.cache, args.max_age_days)
+  papers = fetch_publications(author_id, cache, args.workers, RateLimiter(args.rpm))
+  cache.save()
   if not papers:
     print("No publications found for the provided author ID", file=sys.stderr)
     return 1
@@ -0,0 +1,163 @@
+"""Single-pass, section-level text extraction from the site's HTML pages.
+
+:class:`SectionExtractor` walks a page once with :class:`html.parser.HTMLParser`
+and groups visible text by section: a new section starts at every
+``<section>`` element (keyed by its ``id``) and at every ``<h1>``/``<h2>``
+outside one (keyed by a slug of the heading).  Script, style, navigation and
+page chrome (``<header>``/``<footer>``) are skipped, as are Jekyll Liquid
+tags, so the result tracks the page content without hardcoded copies.
+"""
+
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+
+SKIP_TAGS = frozenset({"script", "style", "nav", "header", "footer", "noscript", "template", "svg", "button"})
+BLOCK_TAGS = frozenset({
+    "p", "li", "div", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6",
+    "br", "tr", "td", "th", "dt", "dd", "blockquote", "pre", "figcaption", "ul", "ol",
+})
+HEADING_TAGS = frozenset({"h1", "h2"})
+VOID_TAGS = frozenset({"br", "img", "input", "meta", "link", "hr", "source", "wbr", "area", "col", "embed"})
+
+FRONT_MATTER_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+LIQUID_RE = re.compile(r"\{\{.*?\}\}|\{%.*?%\}", re.DOTALL)
+WHITESPACE_RE = re.compile(r"\s+")
+WORD_RE = re.compile(r"\w")
+SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text: str) -> str:
+    return SLUG_RE.sub("-", text.lower()).strip("-") or "section"
+
+
+def split_front_matter(page: str) -> Tuple[Dict[str, str], str]:
+    """Return simple ``key: value`` front matter pairs and the page body."""
+    match = FRONT_MATTER_RE.match(page)
+    if not match:
+        return {}, page
+    fields = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            fields[key.strip()] = value.strip().strip("\"'")
+    return fields, page[match.end():]
+
+
+class SectionExtractor(HTMLParser):
+    """Collect ``{"key", "heading", "text"}`` sections from one page."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.sections: List[Dict[str, str]] = []
+        self._skip_depth = 0
+        self._section_depth = 0
+        self._key: Optional[str] = "intro"
+        self._heading: Optional[str] = None
+        self._blocks: List[str] = []
+        self._block: List[str] = []
+        self._in_heading = False
+        self._heading_parts: List[str] = []
+
+    # -- section bookkeeping ---------------------------------------------
+
+    def _end_block(self) -> None:
+        text = WHITESPACE_RE.sub(" ", "".join(self._block)).strip()
+        if text:
+            self._blocks.append(text if text[-1] in ".!?:;" else f"{text}.")
+        self._block = []
+
+    def _flush_section(self) -> None:
+        self._end_block()
+        # Sections whose only text is their heading (e.g. filled in by JavaScript or Liquid) are dropped.
+        has_content = any(
+            WORD_RE.search(block) and block.rstrip(".") != self._heading for block in self._blocks
+        )
+        if has_content:
+            key = self._key or (slugify(self._heading) if self._heading else f"section-{len(self.sections)}")
+            if any(section["key"] == key for section in self.sections):
+                key = f"{key}-{len(self.sections)}"
+            self.sections.append({
+                "key": key,
+                "heading": self._heading or "",
+                "text": " ".join(self._blocks),
+            })
+        self._blocks = []
+
+    def _start_section(self, key: Optional[str] = None) -> None:
+        """Close the current section; ``key=None`` derives the key from the next heading."""
+        self._flush_section()
+        self._key = key
+        self._heading = None
+
+    # -- HTMLParser callbacks --------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = 1
+            return
+
+        if tag == "section":
+            self._section_depth += 1
+            if self._section_depth == 1:
+                self._start_section(next((value for name, value in attrs if name == "id" and value), None))
+        elif tag in HEADING_TAGS and not self._section_depth and (self._blocks or "".join(self._block).strip()):
+            self._start_section()
+        if tag in HEADING_TAGS:
+            self._in_heading = True
+            self._heading_parts = []
+        if tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if not self._skip_depth and tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in VOID_TAGS:
+            return
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            return
+
+        if tag in HEADING_TAGS and self._in_heading:
+            self._in_heading = False
+            heading = WHITESPACE_RE.sub(" ", "".join(self._heading_parts)).strip()
+            if heading and self._heading is None:
+                self._heading = heading
+        if tag in BLOCK_TAGS:
+            self._end_block()
+        if tag == "section" and self._section_depth:
+            self._section_depth -= 1
+            if not self._section_depth:
+                self._start_section()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        if "{" in data:
+            data = LIQUID_RE.sub(" ", data)
+        self._block.append(data)
+        if self._in_heading:
+            self._heading_parts.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush_section()
+
+
+def extract_sections(page: str) -> Tuple[Dict[str, str], List[Dict[str, str]]]:
+    """Parse a page (front matter allowed) in one pass; returns ``(front_matter, sections)``."""
+    front_matter, body = split_front_matter(page)
+    extractor = SectionExtractor()
+    extractor.feed(body)
+    extractor.close()
+    return front_matter, extractor.sections
@@ -0,0 +1,440 @@
+"""Small keep-alive HTTP session shared by the site data scripts.
+
+``urllib.request.urlopen`` opens a fresh TCP/TLS connection for every call
+and has no retry policy.  :class:`HttpSession` keeps one persistent
+``http.client`` connection per (thread, host), applies a default timeout,
+asks for gzip transfer encoding, retries 429/5xx responses with exponential
+backoff and can be throttled by a shared :class:`RateLimiter` (or a
+:class:`HostRateLimiter`, one budget per host; a retry backs off every
+caller of the host, not just the one that was refused).  With a
+:class:`ResponseCache`, GET requests are made conditional on the cached
+``ETag``/``Last-Modified`` and a ``304 Not Modified`` is answered from disk.
+Only the standard library is used.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+import instrumentation
+
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpError(Exception):
+    """Raised when a request fails with a non-retryable status or runs out of retries."""
+
+    def __init__(self, status: int, body: bytes, url: str) -> None:
+        super().__init__(f"HTTP {status} for {url}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+        self.url = url
+
+
+class HttpResponse:
+    """Fully-read response: status, lower-cased headers and body bytes."""
+
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes, from_cache: bool = False) -> None:
+        self.status = status
+        self.headers = dict(headers)
+        self.body = body
+        self.from_cache = from_cache
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly to stay under ``per_minute``.
+
+    A budget of ``0`` (or less) disables throttling.  ``jitter`` randomizes
+    each gap by up to that fraction (the mean rate is unchanged), so several
+    clients do not fall into lockstep.  :meth:`defer` holds every caller back,
+    e.g. after a 429.  ``host`` is accepted for interface compatibility with
+    :class:`HostRateLimiter`; one limiter is one budget for all hosts.
+    """
+
+    def __init__(self, per_minute: float = 0.0, jitter: float = 0.0) -> None:
+        self._interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._jitter = min(max(jitter, 0.0), 1.0)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self, host: Optional[str] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            gap = self._interval
+            if gap and self._jitter:
+                gap *= 1 + random.uniform(-self._jitter, self._jitter)
+            self._next_slot = slot + gap
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, seconds: float, host: Optional[str] = None) -> None:
+        """Push the next slot at least ``seconds`` into the future."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One :class:`RateLimiter` per host, each with the same budget and jitter."""
+
+    def __init__(self, per_minute: float = 0.0, jitter: float = 0.0) -> None:
+        self.per_minute = per_minute
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def _limiter(self, host: Optional[str]) -> RateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(host or "")
+            if limiter is None:
+                limiter = self._limiters[host or ""] = RateLimiter(self.per_minute, self.jitter)
+            return limiter
+
+    def acquire(self, host: Optional[str] = None) -> None:
+        self._limiter(host).acquire()
+
+    def defer(self, seconds: float, host: Optional[str] = None) -> None:
+        self._limiter(host).defer(seconds)
+
+
+class ResponseCache:
+    """On-disk store of GET bodies and their validators, one pair of files per URL."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.body")
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for ``url`` (empty when nothing is cached)."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url: str) -> Optional[HttpResponse]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return HttpResponse(200, meta.get("headers", {}), body, from_cache=True)
+
+    def store(self, url: str, response: HttpResponse) -> None:
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        headers = {k: v for k, v in response.headers.items() if k in ("content-type", "etag", "last-modified")}
+        for path, data in (
+            (body_path, response.body),
+            (meta_path, json.dumps({"url": url, "etag": etag, "last_modified": last_modified, "headers": headers}).encode("utf-8")),
+        ):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+
+class HttpSession:
+    """Pooled HTTP client with timeouts, retry/backoff, gzip and optional rate limiting/caching."""
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.headers = {"Accept-Encoding": "gzip", **(headers or {})}
+        self.cache = cache
+        self._local = threading.local()
+        self._all_connections: list[http.client.HTTPConnection] = []
+        self._conn_lock = threading.Lock()
+
+    # -- connection pool -------------------------------------------------
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        pool: Dict[Tuple[str, str], http.client.HTTPConnection] = getattr(self._local, "pool", None) or {}
+        self._local.pool = pool
+        key = (scheme, netloc)
+        conn = pool.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            pool[key] = conn
+            with self._conn_lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str) -> None:
+        pool = getattr(self._local, "pool", {})
+        conn = pool.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+            with self._conn_lock:
+                if conn in self._all_connections:
+                    self._all_connections.remove(conn)
+
+    def close(self) -> None:
+        with self._conn_lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+
+    def __enter__(self) -> "HttpSession":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # -- requests --------------------------------------------------------
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    def _throttle(self, url: str) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(urllib.parse.urlsplit(url).netloc)
+
+    def _back_off(self, url: str, attempt: int, retry_after: Optional[str]) -> None:
+        """Wait before a retry; with a rate limiter every caller for the host waits too."""
+        instrumentation.current().record_retry()
+        delay = self._retry_delay(attempt, retry_after)
+        if self.rate_limiter is not None:
+            self.rate_limiter.defer(delay, urllib.parse.urlsplit(url).netloc)
+        else:
+            time.sleep(delay)
+
+    def _open(
+        self, method: str, url: str, body: Optional[bytes], headers: Mapping[str, str]
+    ) -> Tuple[http.client.HTTPResponse, Dict[str, str], float]:
+        """Send the request and read the status line and headers (the body is left unread)."""
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        conn = self._connection(parts.scheme, parts.netloc)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=dict(headers))
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive socket or network hiccup: start over on a new connection.
+            self._drop_connection(parts.scheme, parts.netloc)
+            raise
+        resp_headers = {name.lower(): value for name, value in response.getheaders()}
+        return response, resp_headers, started
+
+    def _finish(
+        self, url: str, response: http.client.HTTPResponse, headers: Mapping[str, str],
+        started: float, bytes_out: int, bytes_in: int,
+    ) -> None:
+        netloc = urllib.parse.urlsplit(url).netloc
+        instrumentation.current().record_http(netloc, response.status, time.perf_counter() - started, bytes_out, bytes_in)
+        if headers.get("connection", "").lower() == "close":
+            self._drop_connection(urllib.parse.urlsplit(url).scheme, netloc)
+
+    def _read(self, url: str, response: http.client.HTTPResponse) -> bytes:
+        try:
+            return response.read()
+        except (http.client.HTTPException, OSError):
+            parts = urllib.parse.urlsplit(url)
+            self._drop_connection(parts.scheme, parts.netloc)
+            raise
+
+    def _send_once(
+        self, method: str, url: str, body: Optional[bytes], headers: Mapping[str, str]
+    ) -> HttpResponse:
+        response, resp_headers, started = self._open(method, url, body, headers)
+        payload = self._read(url, response)
+        self._finish(url, response, resp_headers, started, len(body or b""), len(payload))
+        if resp_headers.get("content-encoding", "").lower() == "gzip":
+            payload = gzip.decompress(payload)
+            del resp_headers["content-encoding"]
+        return HttpResponse(response.status, resp_headers, payload)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> HttpResponse:
+        """Send a request, retrying 429/5xx and connection errors with backoff."""
+        merged = {**self.headers, **(headers or {})}
+        cacheable = self.cache is not None and method == "GET"
+        if cacheable:
+            merged.update(self.cache.validators(url))
+        attempt = 0
+        while True:
+            self._throttle(url)
+            try:
+                response = self._send_once(method, url, body, merged)
+            except (http.client.HTTPException, OSError):
+                if attempt >= self.max_retries:
+                    raise
+                self._back_off(url, attempt, None)
+                attempt += 1
+                continue
+
+            if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                self._back_off(url, attempt, response.headers.get("retry-after"))
+                attempt += 1
+                continue
+            if response.status == 304 and cacheable:
+                cached = self.cache.load(url)
+                if cached is not None:
+                    self.cache.hits += 1
+                    instrumentation.current().count("http_not_modified")
+                    return cached
+            if response.status >= 400:
+                raise HttpError(response.status, response.body, url)
+            if cacheable and response.status == 200:
+                self.cache.misses += 1
+                self.cache.store(url, response)
+            return response
+
+    def stream(
+        self, url: str, headers: Optional[Mapping[str, str]] = None, chunk_size: int = 64 * 1024
+    ) -> Iterator[bytes]:
+        """GET ``url`` and yield the decoded body in chunks as they arrive.
+
+        Retries and conditional caching behave as in :meth:`request`, but only
+        until the first chunk has been yielded.  Closing the generator early
+        drains the rest of the body so the connection can be reused.
+        """
+        merged = {**self.headers, **(headers or {})}
+        cacheable = self.cache is not None
+        if cacheable:
+            merged.update(self.cache.validators(url))
+        attempt = 0
+        while True:
+            self._throttle(url)
+            try:
+                response, resp_headers, started = self._open("GET", url, None, merged)
+            except (http.client.HTTPException, OSError):
+                if attempt >= self.max_retries:
+                    raise
+                self._back_off(url, attempt, None)
+                attempt += 1
+                continue
+
+            if response.status == 200:
+                break
+            payload = self._read(url, response)
+            self._finish(url, response, resp_headers, started, 0, len(payload))
+            if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                self._back_off(url, attempt, resp_headers.get("retry-after"))
+                attempt += 1
+                continue
+            if response.status == 304 and cacheable:
+                cached = self.cache.load(url)
+                if cached is not None:
+                    self.cache.hits += 1
+                    instrumentation.current().count("http_not_modified")
+                    yield cached.body
+                    return
+            if response.status >= 400:
+                raise HttpError(response.status, payload, url)
+            if resp_headers.get("content-encoding", "").lower() == "gzip":
+                payload = gzip.decompress(payload)
+            yield payload
+            return
+
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if resp_headers.pop("content-encoding", "").lower() == "gzip" else None
+        keep = [] if cacheable and ("etag" in resp_headers or "last-modified" in resp_headers) else None
+        received = 0
+        try:
+            while True:
+                try:
+                    raw = response.read1(chunk_size)
+                except (http.client.HTTPException, OSError):
+                    keep = None
+                    parts = urllib.parse.urlsplit(url)
+                    self._drop_connection(parts.scheme, parts.netloc)
+                    raise
+                if not raw:
+                    break
+                received += len(raw)
+                chunk = decoder.decompress(raw) if decoder is not None else raw
+                if keep is not None:
+                    keep.append(chunk)
+                if chunk:
+                    yield chunk
+            if decoder is not None:
+                tail = decoder.flush()
+                if keep is not None:
+                    keep.append(tail)
+                if tail:
+                    yield tail
+        finally:
+            if not response.isclosed():
+                # Closed early: drain the body so the socket can be reused (and the cache stays complete).
+                try:
+                    rest = response.read()
+                    received += len(rest)
+                    if keep is not None:
+                        keep.append(decoder.decompress(rest) + decoder.flush() if decoder is not None else rest)
+                except (http.client.HTTPException, OSError, zlib.error):
+                    keep = None
+                    parts = urllib.parse.urlsplit(url)
+                    self._drop_connection(parts.scheme, parts.netloc)
+            self._finish(url, response, resp_headers, started, 0, received)
+            if keep is not None:
+                self.cache.misses += 1
+                self.cache.store(url, HttpResponse(200, resp_headers, b"".join(keep)))
+
+    def get(self, url: str, headers: Optional[Mapping[str, str]] = None) -> HttpResponse:
+        return self.request("GET", url, headers=headers)
+
+    def post(self, url: str, body: bytes, headers: Optional[Mapping[str, str]] = None) -> HttpResponse:
+        return self.request("POST", url, body=body, headers=headers)
@@ -0,0 +1,213 @@
+"""Shared instrumentation for the site data scripts.
+
+One process-wide :class:`Instrumentation` collects
+
+* per-stage wall time (``with stage("parse"):``), exclusive of nested stages,
+  so a stage pulling from another generator is not double counted;
+* HTTP request latency histograms, status codes, bytes in/out and retries
+  (recorded automatically by :class:`http_session.HttpSession`);
+* free-form counters such as cache hits;
+* peak resident memory.
+
+Scripts call :func:`add_arguments` on their parser and wrap their work in
+:func:`session`, which writes a machine-readable JSON report for
+``--report PATH`` and a cProfile dump for ``--profile PATH``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import cProfile
+import datetime as dt
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+T = TypeVar("T")
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Instrumentation:
+    """Thread-safe metrics store for one script run."""
+
+    def __init__(self, script: str = "") -> None:
+        self.script = script
+        self.started = time.perf_counter()
+        self.started_at = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, Any] = {}
+        self.http_latencies_ms: List[float] = []
+        self.http_status: Dict[str, int] = {}
+        self.http_hosts: Dict[str, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # -- stages ------------------------------------------------------------
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        now = time.perf_counter()
+        if stack:
+            parent, parent_start = stack[-1]
+            self._add_time(parent, now - parent_start, calls=0)
+        stack.append((name, now))
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _, start = stack.pop()
+            self._add_time(name, end - start, calls=1)
+            if stack:
+                stack[-1] = (stack[-1][0], end)
+
+    def _add_time(self, name: str, seconds: float, calls: int) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += calls
+
+    def timed_iter(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable``, charging the time spent producing each item to ``name``."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    # -- counters and HTTP -------------------------------------------------
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.counters[name] = value
+
+    def record_http(self, host: str, status: int, seconds: float, bytes_out: int = 0, bytes_in: int = 0) -> None:
+        with self._lock:
+            self.http_latencies_ms.append(seconds * 1000)
+            self.http_status[str(status)] = self.http_status.get(str(status), 0) + 1
+            self.http_hosts[host] = self.http_hosts.get(host, 0) + 1
+            self.bytes_out += bytes_out
+            self.bytes_in += bytes_in
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    # -- reporting ---------------------------------------------------------
+
+    @staticmethod
+    def peak_memory_mb() -> Optional[float]:
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    def _latency_summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.http_latencies_ms)
+        histogram: Dict[str, int] = {}
+        for bound in LATENCY_BUCKETS_MS:
+            histogram[f"<={bound}"] = 0
+        histogram[f">{LATENCY_BUCKETS_MS[-1]}"] = 0
+        for value in latencies:
+            bucket = next((f"<={b}" for b in LATENCY_BUCKETS_MS if value <= b), f">{LATENCY_BUCKETS_MS[-1]}")
+            histogram[bucket] += 1
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+
+        return {
+            "histogram": histogram,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": round(latencies[-1], 2) if latencies else None,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "script": self.script,
+                "started_at": self.started_at,
+                "wall_seconds": round(time.perf_counter() - self.started, 3),
+                "stages": {
+                    name: {"seconds": round(entry["seconds"], 4), "calls": int(entry["calls"])}
+                    for name, entry in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"])
+                },
+                "http": {
+                    "requests": len(self.http_latencies_ms),
+                    "retries": self.retries,
+                    "bytes_out": self.bytes_out,
+                    "bytes_in": self.bytes_in,
+                    "status": dict(self.http_status),
+                    "hosts": dict(self.http_hosts),
+                    "latency_ms": self._latency_summary(),
+                },
+                "counters": dict(self.counters),
+                "peak_memory_mb": self.peak_memory_mb(),
+            }
+
+
+_current = Instrumentation()
+
+
+def current() -> Instrumentation:
+    """The process-wide instrumentation instance."""
+    return _current
+
+
+def stage(name: str):
+    return _current.stage(name)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--report", default=None, metavar="PATH",
+                        help="Write a JSON timing/HTTP/memory report to PATH.")
+    parser.add_argument("--profile", default=None, metavar="PATH",
+                        help="Run under cProfile and dump stats to PATH (read with pstats).")
+
+
+@contextlib.contextmanager
+def session(script: str, report_path: Optional[str] = None, profile_path: Optional[str] = None) -> Iterator[Instrumentation]:
+    """Reset the metrics, optionally profile, and write the report on exit (even on failure)."""
+    global _current
+    _current = Instrumentation(script)
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield _current
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f"Wrote cProfile stats to {profile_path}", file=sys.stderr)
+        if report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(_current.report(), f, indent=2)
+                f.write("\n")
+            print(f"Wrote instrumentation report to {report_path}", file=sys.stderr)
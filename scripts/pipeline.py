@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Bring every generated site artifact up to date in one invocation.
+
+The data scripts are modelled as a small DAG of stages, each with declared
+dependencies, input globs and outputs:
+
+    now ──────┐
+              ├──> rag
+    papers ───┘
+    scholar
+
+Fetch stages talk to the network, so their inputs cannot be hashed; they
+always run (concurrently, on a thread pool) and rely on their own
+conditional requests and no-op-write checks to stay cheap.  Local stages are
+skipped when the hash of their input files and arguments matches the last
+successful run and their outputs are still as that run left them.  State is
+kept in ``.cache/pipeline_state.json``.
+
+Usage:
+    python scripts/pipeline.py                     # nightly: run whatever is stale
+    python scripts/pipeline.py --dry-run           # show the plan
+    python scripts/pipeline.py --only rag --force  # rebuild one stage
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
+
+import instrumentation
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+STATE_PATH = os.path.join(ROOT, ".cache", "pipeline_state.json")
+DEFAULT_SCHOLAR_ID = "bh9os08AAAAJ"
+
+
+class Stage:
+    """One script invocation with its dependencies, inputs and outputs (paths relative to the repo root)."""
+
+    def __init__(
+        self,
+        name: str,
+        script: str,
+        args: Sequence[str] = (),
+        deps: Sequence[str] = (),
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        fetch: bool = False,
+        requires_env: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.script = script
+        self.args = list(args)
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.fetch = fetch
+        self.requires_env = list(requires_env)
+
+    def command(self, report_dir: Optional[str]) -> List[str]:
+        command = [sys.executable, os.path.join(SCRIPTS, self.script), *self.args]
+        if report_dir:
+            command += ["--report", os.path.join(report_dir, f"{self.name}.json")]
+        return command
+
+    def missing_env(self) -> List[str]:
+        return [name for name in self.requires_env if not os.getenv(name)]
+
+
+def default_stages(scholar_id: str) -> List[Stage]:
+    return [
+        Stage(
+            "now", "update_now.py",
+            outputs=["_data/now.yml"],
+            fetch=True,
+        ),
+        Stage(
+            "papers", "update_papers.py", ["--scholar-id", scholar_id, "--merge"],
+            outputs=["site_data/papers.json", "site_data/manifest.json"],
+            fetch=True,
+        ),
+        Stage(
+            "scholar", "fetch_scholar.py",
+            outputs=["assets/data/papers.json", "assets/data/manifest.json"],
+            fetch=True,
+            requires_env=["SCHOLAR_AUTHOR_ID"],
+        ),
+        Stage(
+            "rag", "build_rag_index.py", ["--queries", "worker/anticipated_queries.txt"],
+            deps=["now", "papers"],
+            inputs=[
+                "*.html", "site_data/papers.json", "_data/now.yml", "blog/posts/*", "_posts/*.md",
+                "worker/anticipated_queries.txt",
+                # Every build module and its helpers; a glob cannot drift as imports change.
+                "scripts/*.py",
+            ],
+            outputs=["worker/src/rag_index.json"],
+            requires_env=["GEMINI_API_KEY"],
+        ),
+    ]
+
+
+def hash_files(patterns: Sequence[str]) -> str:
+    """sha256 over the sorted relative paths and contents of every file matching ``patterns``."""
+    paths = sorted({
+        path for pattern in patterns for path in glob.glob(os.path.join(ROOT, pattern)) if os.path.isfile(path)
+    })
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.relpath(path, ROOT).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def input_hash(stage: Stage) -> str:
+    digest = hashlib.sha256(json.dumps([stage.script, stage.args]).encode("utf-8"))
+    digest.update(hash_files(stage.inputs).encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_state(path: str) -> Dict[str, Dict[str, str]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path: str, state: Dict[str, Dict[str, str]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def order(stages: Sequence[Stage]) -> List[Stage]:
+    """Topological order; raises ValueError on unknown dependencies or cycles."""
+    by_name = {stage.name: stage for stage in stages}
+    ordered: List[Stage] = []
+    visiting = set()
+
+    def visit(stage: Stage) -> None:
+        if stage in ordered:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"dependency cycle through {stage.name!r}")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"{stage.name!r} depends on unknown stage {dep!r}")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+class Runner:
+    """Runs a DAG of stages, skipping up-to-date local stages and overlapping independent ones."""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        state_path: str = STATE_PATH,
+        force: bool = False,
+        dry_run: bool = False,
+        report_dir: Optional[str] = None,
+        workers: int = 4,
+    ) -> None:
+        self.stages = order(stages)
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.force = force
+        self.dry_run = dry_run
+        self.report_dir = report_dir
+        self.workers = workers
+        self.results: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def up_to_date(self, stage: Stage) -> Optional[str]:
+        """The current input hash when ``stage`` can be skipped, else None."""
+        if self.force or stage.fetch:
+            return None
+        previous = self.state.get(stage.name, {})
+        current = input_hash(stage)
+        if previous.get("inputs") != current or previous.get("outputs") != hash_files(stage.outputs):
+            return None
+        if not all(os.path.exists(os.path.join(ROOT, path)) for path in stage.outputs):
+            return None
+        return current
+
+    def run_stage(self, stage: Stage) -> str:
+        """Run one stage; returns its status (ran, skipped, failed, ...)."""
+        failed = [dep for dep in stage.deps if self.results.get(dep) in ("failed", "blocked")]
+        if failed:
+            return "blocked"
+        missing = stage.missing_env()
+        if missing:
+            print(f"[{stage.name}] skipped: {', '.join(missing)} not set")
+            return "unavailable"
+        if self.up_to_date(stage) is not None:
+            print(f"[{stage.name}] up to date")
+            return "skipped"
+        command = stage.command(self.report_dir)
+        if self.dry_run:
+            print(f"[{stage.name}] would run: {' '.join(command)}")
+            return "planned"
+
+        inputs = None if stage.fetch else input_hash(stage)
+        with instrumentation.stage(stage.name):
+            completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        output = (completed.stdout + completed.stderr).rstrip()
+        with self._lock:
+            for line in output.splitlines():
+                print(f"[{stage.name}] {line}")
+            if completed.returncode != 0:
+                print(f"[{stage.name}] failed with exit code {completed.returncode}")
+                return "failed"
+            if inputs is not None:
+                self.state[stage.name] = {"inputs": inputs, "outputs": hash_files(stage.outputs)}
+        return "ran"
+
+    def run(self) -> Dict[str, str]:
+        pending = list(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            while pending or running:
+                for stage in list(pending):
+                    if all(dep in self.results for dep in stage.deps):
+                        pending.remove(stage)
+                        running[pool.submit(self.run_stage, stage)] = stage
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    self.results[stage.name] = future.result()
+                    instrumentation.current().count(self.results[stage.name])
+        if not self.dry_run:
+            save_state(self.state_path, self.state)
+        return self.results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the site data pipeline, doing only the work that is stale.")
+    parser.add_argument("--only", nargs="+", default=None, metavar="STAGE",
+                        help="Run just these stages (their dependencies are not pulled in).")
+    parser.add_argument("--force", action="store_true", help="Run stages even when their inputs are unchanged.")
+    parser.add_argument("--dry-run", action="store_true", help="Print what would run without running it.")
+    parser.add_argument("--scholar-id", default=os.getenv("SCHOLAR_AUTHOR_ID") or DEFAULT_SCHOLAR_ID,
+                        help="Google Scholar user id for update_papers.py.")
+    parser.add_argument("--workers", type=int, default=4, help="Stages to run concurrently.")
+    parser.add_argument("--report-dir", default=None,
+                        help="Pass --report <dir>/<stage>.json to every stage.")
+    parser.add_argument("--state", default=STATE_PATH, help="Where input hashes are recorded.")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    stages = default_stages(args.scholar_id)
+    if args.only:
+        unknown = set(args.only) - {stage.name for stage in stages}
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+        stages = [stage for stage in stages if stage.name in args.only]
+        for stage in stages:
+            stage.deps = [dep for dep in stage.deps if dep in args.only]
+
+    with instrumentation.session("pipeline", args.report, args.profile):
+        results = Runner(stages, args.state, args.force, args.dry_run, args.report_dir, args.workers).run()
+
+    print("Summary: " + ", ".join(f"{stage.name}={results[stage.name]}" for stage in stages))
+    return 1 if "failed" in results.values() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Inverted-file (IVF) approximate nearest-neighbour index for the RAG index.
+
+Chunk vectors are clustered with spherical k-means; each query is compared
+with the centroids first and only the rows in the ``n_probe`` closest lists
+are scanned, so query cost grows with ``n / n_lists * n_probe`` rather than
+``n``.  The structure is serialized next to the index as
+``<name>.ivf.json``::
+
+    {"type": "ivf", "dim": 768, "n_lists": 8, "n_probe": 2,
+     "ids": [...chunk ids, same order as the index...],
+     "centroids": [[...], ...], "lists": [[row, ...], ...]}
+
+Usage:
+    python scripts/rag_ann.py [--index worker/src/rag_index.json] [-k 4]   # recall report
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag_retrieval import DEFAULT_INDEX, RagIndex, _unit_rows
+
+
+# Norm of the perturbation added to each indexed vector to make a recall probe query.
+QUERY_NOISE = 0.05
+
+
+def default_n_lists(count: int) -> int:
+    return max(1, int(round(math.sqrt(count))))
+
+
+def ann_path(index_path: str) -> str:
+    stem, _ = os.path.splitext(index_path)
+    if stem.endswith(".meta"):
+        stem = stem[: -len(".meta")]
+    return f"{stem}.ivf.json"
+
+
+def spherical_kmeans(matrix: np.ndarray, n_lists: int, iterations: int = 25, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Cluster unit rows by cosine; returns ``(centroids, assignment)``."""
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(matrix))
+    centroids = matrix[rng.choice(len(matrix), size=n_lists, replace=False)].copy()
+    assignment = np.full(len(matrix), -1)
+    for _ in range(iterations):
+        new_assignment = np.argmax(matrix @ centroids.T, axis=1)
+        if np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+        for j in range(n_lists):
+            members = matrix[assignment == j]
+            if len(members):
+                centroids[j] = members.sum(axis=0)
+            else:
+                # Re-seed an empty list with the row worst served by its centroid.
+                worst = np.argmin(np.einsum("ij,ij->i", matrix, centroids[assignment]))
+                centroids[j] = matrix[worst]
+        centroids = _unit_rows(centroids)
+    return centroids.astype(np.float32), assignment
+
+
+class IvfIndex:
+    """Centroids plus per-list row ids over a :class:`RagIndex` matrix."""
+
+    def __init__(self, centroids: np.ndarray, lists: List[np.ndarray], n_probe: int = 2,
+                 ids: Optional[Sequence[str]] = None) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.lists = [np.asarray(rows, dtype=np.int64) for rows in lists]
+        self.n_probe = n_probe
+        self.ids = list(ids or [])
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: Optional[int] = None, n_probe: Optional[int] = None,
+              ids: Optional[Sequence[str]] = None, seed: int = 0) -> "IvfIndex":
+        matrix = _unit_rows(np.asarray(matrix, dtype=np.float32))
+        n_lists = n_lists or default_n_lists(len(matrix))
+        centroids, assignment = spherical_kmeans(matrix, n_lists, seed=seed)
+        lists = [np.flatnonzero(assignment == j) for j in range(len(centroids))]
+        return cls(centroids, lists, n_probe or max(1, len(centroids) // 4), ids)
+
+    def search(self, index: RagIndex, queries: np.ndarray, k: int = 4,
+               n_probe: Optional[int] = None) -> Tuple[List[List[Tuple[int, float]]], float]:
+        """Approximate top-k per query; also returns the mean fraction of rows scanned."""
+        queries = _unit_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :n_probe]
+        results = []
+        scanned = 0
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([self.lists[j] for j in lists])
+            scanned += len(rows)
+            if not len(rows):
+                results.append([])
+                continue
+            scores = index.matrix[rows] @ query
+            top_k = min(k, len(rows))
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(int(rows[i]), float(scores[i])) for i in top])
+        return results, scanned / (len(queries) * max(1, len(index)))
+
+    def to_json(self) -> Dict:
+        return {
+            "type": "ivf",
+            "dim": int(self.centroids.shape[1]),
+            "n_lists": len(self.centroids),
+            "n_probe": self.n_probe,
+            "ids": self.ids,
+            "centroids": [[round(float(v), 7) for v in row] for row in self.centroids],
+            "lists": [rows.tolist() for rows in self.lists],
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "IvfIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("type") != "ivf":
+            raise ValueError(f"Unsupported ANN structure: {data.get('type')}")
+        return cls(np.asarray(data["centroids"], dtype=np.float32), data["lists"], data["n_probe"], data["ids"])
+
+
+def recall_report(index: RagIndex, ivf: IvfIndex, k: int = 4,
+                  queries: Optional[np.ndarray] = None) -> List[Dict[str, float]]:
+    """Recall@k of the IVF search against brute force for a sweep of ``n_probe``.
+
+    The sweep covers powers of two up to the number of lists plus the
+    structure's default ``n_probe``.  Without explicit ``queries`` every indexed vector is used as a query,
+    slightly perturbed so that it is not trivially its own nearest neighbour.  The noise is scaled by
+    ``1 / sqrt(dim)`` so its norm is about ``QUERY_NOISE`` (cosine to the source chunk ~0.999) at any dimension.
+    """
+    if queries is None:
+        rng = np.random.default_rng(1)
+        sigma = QUERY_NOISE / np.sqrt(max(1, index.dim))
+        queries = index.matrix + rng.normal(0, sigma, index.matrix.shape).astype(np.float32)
+    exact = index.search(queries, k)
+    n_lists = len(ivf.centroids)
+    probes = {min(ivf.n_probe, n_lists), n_lists}
+    probes.update(2 ** i for i in range(n_lists.bit_length()) if 2 ** i < n_lists)
+    rows = []
+    for n_probe in sorted(probes):
+        started = time.perf_counter()
+        approx, scanned = ivf.search(index, queries, k, n_probe)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        hits = sum(
+            len({row for row, _ in truth} & {row for row, _ in found})
+            for truth, found in zip(exact, approx)
+        )
+        total = sum(len(truth) for truth in exact)
+        rows.append({
+            "n_probe": n_probe,
+            "recall": hits / total if total else 1.0,
+            "scanned_fraction": scanned,
+            "ms_per_query": elapsed_ms,
+        })
+    return rows
+
+
+def print_report(rows: List[Dict[str, float]], k: int, default_probe: int) -> None:
+    print(f"{'n_probe':>7} {f'recall@{k}':>9} {'scanned':>8} {'ms/query':>9}")
+    for row in rows:
+        marker = "  <- default" if row["n_probe"] == default_probe else ""
+        print(f"{row['n_probe']:>7} {row['recall']:>9.3f} {row['scanned_fraction']:>8.1%} "
+              f"{row['ms_per_query']:>9.3f}{marker}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report IVF recall against brute-force retrieval.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index path (.json, .meta.json or .bin).")
+    parser.add_argument("--ann", default=None, help="IVF file (default: <index>.ivf.json, built if missing).")
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    index = RagIndex.load(args.index)
+    path = args.ann or ann_path(args.index)
+    if os.path.exists(path):
+        ivf = IvfIndex.load(path)
+        if ivf.ids and ivf.ids != index.ids:
+            print(f"ERROR: {path} was built for a different index.", file=sys.stderr)
+            return 1
+    else:
+        ivf = IvfIndex.build(index.matrix, ids=index.ids)
+
+    rows = recall_report(index, ivf, args.k)
+    if args.json:
+        print(json.dumps({"n_lists": len(ivf.centroids), "default_n_probe": ivf.n_probe, "rows": rows}, indent=2))
+    else:
+        print(f"IVF: {len(index)} chunks in {len(ivf.centroids)} lists")
+        print_report(rows, args.k, ivf.n_probe)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Retrieval quality versus size and latency for RAG index variants.
+
+A golden set (``worker/golden_set.json``) lists questions together with the
+chunks that should answer them::
+
+    [{"question": "Where did Ibrahim study?", "expected": ["profile-education"]}, ...]
+
+Expected ids are document ids: ``profile-education`` also matches the
+``profile-education-0``, ``profile-education-1``, ... pieces of a document
+that a smaller chunk size splits, so one golden set serves every chunking.
+
+Each variant is a set of ``build_rag_index.py`` flags (reduced dimensions, a
+quantized format, an IVF structure, another chunk size, ...).  Variants are
+built into a scratch directory (the embedding cache is shared, so only new
+dimensions or chunkings cost API calls) or existing indexes are loaded with
+``--index``.  Questions are embedded with each index's own backend, then every
+variant reports recall@k and MRR next to its size on disk and the per-query
+scan latency (embedding time excluded), as a table and as JSON.
+
+Usage:
+    python scripts/rag_eval.py --backend hashed                   # default variants, offline
+    python scripts/rag_eval.py --variant "d256-int8=--dimensions 256 --format int8"
+    python scripts/rag_eval.py --index worker/src/rag_index.json   # evaluate existing indexes
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_backends import BACKENDS, backend_for_index
+from rag_ann import IvfIndex, ann_path
+from rag_index_format import sidecar_paths
+from rag_retrieval import RagIndex
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_SCRIPT = os.path.join(ROOT, "scripts", "build_rag_index.py")
+DEFAULT_GOLDEN = os.path.join(ROOT, "worker", "golden_set.json")
+DEFAULT_OUTPUT = os.path.join(ROOT, "reports", "rag_eval.json")
+DEFAULT_VARIANTS = {
+    "baseline": "",
+    "dim256": "--dimensions 256",
+    "dim128": "--dimensions 128",
+    "f16": "--format f16",
+    "int8": "--format int8",
+    "ivf": "--ann ivf",
+    "chunks128": "--chunk-tokens 128 --chunk-overlap 16",
+    "chunks512": "--chunk-tokens 512 --chunk-overlap 64",
+}
+
+
+def read_golden(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    for item in golden:
+        if not item.get("question") or not item.get("expected"):
+            raise SystemExit(f"ERROR: every entry in {path} needs a question and expected chunk ids.")
+    return golden
+
+
+def parse_variant(spec: str) -> Tuple[str, List[str]]:
+    """``NAME=FLAGS`` -> ``(NAME, [flag, ...])``."""
+    name, sep, flags = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=FLAGS, got {spec!r}")
+    return name, shlex.split(flags)
+
+
+def document_pattern(doc_id: str):
+    """Regex matching a document id and its ``-<n>`` chunk pieces."""
+    return re.compile(f"^{re.escape(doc_id)}(?:-\\d+)?$")
+
+
+def index_files(path: str) -> List[str]:
+    """The files an index occupies on disk, including its IVF structure if present."""
+    blob_path, meta_path = sidecar_paths(path)
+    files = [blob_path, meta_path] if os.path.exists(blob_path) else [path]
+    if os.path.exists(ann_path(path)):
+        files.append(ann_path(path))
+    return files
+
+
+def build_variant(name: str, flags: Sequence[str], work_dir: str, common: Sequence[str]) -> str:
+    """Run ``build_rag_index.py`` for one variant and return the path to load."""
+    output = os.path.join(work_dir, name, "rag_index.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    command = [sys.executable, BUILD_SCRIPT, "--output", output, *common, *flags]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip() or f"exit status {result.returncode}")
+    blob_path, meta_path = sidecar_paths(output)
+    return meta_path if os.path.exists(blob_path) else output
+
+
+class QueryEmbedder:
+    """Embed the golden questions once per (backend, model, dim)."""
+
+    def __init__(self, questions: Sequence[str], api_base: Optional[str] = None) -> None:
+        self.questions = list(questions)
+        self.api_base = api_base
+        self._vectors: Dict[Tuple, np.ndarray] = {}
+
+    def for_index(self, index: RagIndex) -> np.ndarray:
+        key = (index.meta.get("backend", "gemini"), index.meta.get("model"), index.dim)
+        if key not in self._vectors:
+            with backend_for_index(index.meta, api_base=self.api_base) as backend:
+                vectors = backend.embed_many(self.questions)
+            if any(vector is None for vector in vectors):
+                raise RuntimeError("question embedding failed")
+            self._vectors[key] = np.asarray(vectors, dtype=np.float32)
+        return self._vectors[key]
+
+
+def evaluate(index: RagIndex, golden: Sequence[Dict], queries: np.ndarray, k: int = 4,
+             repeat: int = 20, ivf: Optional[IvfIndex] = None) -> Dict[str, object]:
+    """Recall@k, MRR and single-query scan latency of one index over the golden set.
+
+    Recall is the fraction of a question's expected documents found in the
+    top k; the reciprocal rank is that of the first relevant chunk.
+    """
+    doc_ids = set()
+    for chunk_id in index.ids:
+        doc_ids.add(chunk_id)
+        doc_ids.add(re.sub(r"-\d+$", "", chunk_id))
+    recall = 0.0
+    reciprocal_ranks = 0.0
+    missing = set()
+    latencies = []
+    scanned = 0.0
+    for item, query in zip(golden, queries):
+        started = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            if ivf is None:
+                (hits,) = index.search(query, k)
+            else:
+                (hits,), fraction = ivf.search(index, query, k)
+        latencies.append((time.perf_counter() - started) * 1000 / max(1, repeat))
+        scanned += fraction if ivf is not None else 1.0
+
+        missing.update(doc_id for doc_id in item["expected"] if doc_id not in doc_ids)
+        patterns = {doc_id: document_pattern(doc_id) for doc_id in item["expected"]}
+        found = set()
+        first = 0
+        for rank, (row, _) in enumerate(hits, start=1):
+            for doc_id, pattern in patterns.items():
+                if pattern.match(index.ids[row]):
+                    found.add(doc_id)
+                    first = first or rank
+        recall += len(found) / len(item["expected"])
+        reciprocal_ranks += 1 / first if first else 0.0
+
+    count = max(1, len(golden))
+    latencies.sort()
+    return {
+        f"recall@{k}": round(recall / count, 4),
+        "mrr": round(reciprocal_ranks / count, 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 4) if latencies else 0.0,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4) if latencies else 0.0,
+        "scanned_fraction": round(scanned / count, 4),
+        "missing_expected": sorted(missing),
+    }
+
+
+def measure(name: str, path: str, golden: Sequence[Dict], embedder: QueryEmbedder,
+            k: int, repeat: int) -> Dict[str, object]:
+    index = RagIndex.load(path)
+    ivf = IvfIndex.load(ann_path(path)) if os.path.exists(ann_path(path)) else None
+    if ivf is not None and ivf.ids and ivf.ids != index.ids:
+        raise RuntimeError(f"{ann_path(path)} was built for a different index")
+    row: Dict[str, object] = {
+        "variant": name,
+        "path": os.path.relpath(path, ROOT) if path.startswith(ROOT) else path,
+        "chunks": len(index),
+        "dim": index.dim,
+        "format": index.meta.get("format", "json"),
+        "ann": "ivf" if ivf is not None else None,
+        "bytes": sum(os.path.getsize(p) for p in index_files(path)),
+    }
+    row.update(evaluate(index, golden, embedder.for_index(index), k, repeat, ivf))
+    return row
+
+
+def print_table(rows: List[Dict[str, object]], k: int) -> None:
+    print(f"{'variant':<14} {'chunks':>6} {'dim':>5} {'format':<6} {'ann':<4} {'size KB':>9} "
+          f"{f'recall@{k}':>9} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} {'scanned':>8}")
+    for row in rows:
+        if "error" in row:
+            print(f"{row['variant']:<14} ERROR: {row['error']}")
+            continue
+        print(
+            f"{row['variant']:<14} {row['chunks']:>6} {row['dim']:>5} {row['format']:<6} {row['ann'] or '-':<4} "
+            f"{row['bytes'] / 1024:>9.1f} {row[f'recall@{k}']:>9.3f} {row['mrr']:>6.3f} "
+            f"{row['p50_ms']:>8.4f} {row['p95_ms']:>8.4f} {row['scanned_fraction']:>8.0%}"
+        )
+    for row in rows:
+        if row.get("missing_expected"):
+            print(f"  {row['variant']}: golden ids not in the index: {', '.join(row['missing_expected'])}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare retrieval quality, size and latency of RAG index variants.")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="Golden set of questions and expected chunk ids.")
+    parser.add_argument("--variant", action="append", type=parse_variant, default=[], metavar="NAME=FLAGS",
+                        help="Build a variant with these build_rag_index.py flags (repeatable; "
+                             f"default: {', '.join(DEFAULT_VARIANTS)}).")
+    parser.add_argument("--index", action="append", default=[],
+                        help="Evaluate an existing index (.json, .meta.json or .bin) instead of building (repeatable).")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="Embedding backend passed to every build (default: the build script's).")
+    parser.add_argument("--api-base", default=None, help="Override the Gemini API base URL.")
+    parser.add_argument("--work-dir", default=None,
+                        help="Keep built variants here (default: a temporary directory).")
+    parser.add_argument("-k", type=int, default=4, help="Chunks retrieved per question (match the Worker's TOP_K).")
+    parser.add_argument("--repeat", type=int, default=20, help="Searches per question when timing the scan.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON report.")
+    args = parser.parse_args()
+
+    golden = read_golden(args.golden)
+    embedder = QueryEmbedder([item["question"] for item in golden], args.api_base)
+    common = []
+    if args.backend:
+        common += ["--backend", args.backend]
+    if args.api_base:
+        common += ["--api-base", args.api_base]
+    variants = args.variant or ([] if args.index else [parse_variant(f"{name}={flags}") for name, flags in DEFAULT_VARIANTS.items()])
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or tmp
+        targets = [(os.path.basename(path), path, None) for path in args.index] + [
+            (name, None, flags) for name, flags in variants
+        ]
+        for name, path, flags in targets:
+            try:
+                if path is None:
+                    print(f"Building {name} ({' '.join(flags) or 'defaults'})...", file=sys.stderr)
+                    path = build_variant(name, flags, work_dir, common)
+                row = measure(name, path, golden, embedder, args.k, args.repeat)
+            except (OSError, RuntimeError, ValueError) as error:
+                row = {"variant": name, "path": path, "error": str(error).splitlines()[-1]}
+            if flags is not None:
+                row["flags"] = flags
+            rows.append(row)
+
+    print_table(rows, args.k)
+    report = {"golden": os.path.relpath(args.golden, ROOT), "questions": len(golden), "k": args.k, "variants": rows}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    return 1 if any("error" in row for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Readers and writers for the RAG index artifact.
+
+``json`` is the original format: one JSON document with every embedding
+written out as float text.  The compact formats split the index in two:
+
+* ``<name>.bin`` -- all vectors packed back to back, little-endian,
+  row-major (``count * dim`` values);
+* ``<name>.meta.json`` -- a small sidecar with the model, format, dimension
+  and the per-chunk ``id``/``title``/``text``/``source`` records, in the same
+  order as the rows of the blob.
+
+Compact encodings:
+
+* ``f32``  -- IEEE float32, lossless for Gemini output;
+* ``f16``  -- IEEE float16, half the size of ``f32``;
+* ``int8`` -- symmetric per-vector quantisation: ``q = round(v / scale)``
+  with ``scale = max(|v|) / 127``; scales are stored in the sidecar.
+"""
+
+from __future__ import annotations
+
+import array
+import json
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+FORMATS = ("json", "f32", "f16", "int8")
+COMPACT_FORMATS = FORMATS[1:]
+METADATA_FIELDS = ("id", "title", "text", "source")
+
+
+def sidecar_paths(path: str) -> Tuple[str, str]:
+    """Return ``(blob_path, meta_path)`` for an output path like ``rag_index.json``."""
+    stem, _ = os.path.splitext(path)
+    if stem.endswith(".meta"):
+        stem = stem[: -len(".meta")]
+    return f"{stem}.bin", f"{stem}.meta.json"
+
+
+# -- vector encoding -----------------------------------------------------
+
+def _little_endian(values: array.array) -> bytes:
+    if sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array.array:
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def quantize_int8(vector: Sequence[float]) -> Tuple[float, List[int]]:
+    peak = max((abs(v) for v in vector), default=0.0)
+    scale = peak / 127.0 if peak else 1.0
+    return scale, [max(-127, min(127, round(v / scale))) for v in vector]
+
+
+def encode_vector(vector: Sequence[float], fmt: str) -> Tuple[bytes, Optional[float]]:
+    """Encode one vector; returns ``(bytes, scale)`` where ``scale`` is only set for int8."""
+    if fmt == "f32":
+        return _little_endian(array.array("f", vector)), None
+    if fmt == "f16":
+        return struct.pack(f"<{len(vector)}e", *vector), None
+    if fmt == "int8":
+        scale, quantized = quantize_int8(vector)
+        return array.array("b", quantized).tobytes(), scale
+    raise ValueError(f"Unknown compact format: {fmt}")
+
+
+def bytes_per_value(fmt: str) -> int:
+    return {"f32": 4, "f16": 2, "int8": 1}[fmt]
+
+
+def decode_vectors(blob: bytes, fmt: str, dim: int, scales: Optional[Sequence[float]] = None) -> List[List[float]]:
+    """Decode a packed blob back into a list of float vectors."""
+    if fmt == "f32":
+        flat: Sequence[float] = _from_little_endian("f", blob)
+    elif fmt == "f16":
+        flat = struct.unpack(f"<{len(blob) // 2}e", blob)
+    elif fmt == "int8":
+        flat = array.array("b", blob)
+    else:
+        raise ValueError(f"Unknown compact format: {fmt}")
+
+    vectors = [list(flat[start:start + dim]) for start in range(0, len(flat), dim)]
+    if fmt == "int8":
+        vectors = [[q * scale for q in row] for row, scale in zip(vectors, scales or [])]
+    return vectors
+
+
+# -- whole-index read/write ---------------------------------------------
+
+class IndexWriter:
+    """Stream index entries to disk one at a time.
+
+    Output goes to ``*.partial`` files that are renamed into place by
+    :meth:`close`, so memory stays flat regardless of corpus size and an
+    interrupted build leaves its partial output behind instead of a
+    truncated index.  ``metadata`` may be updated until :meth:`close`.
+    """
+
+    def __init__(self, path: str, fmt: str = "json", metadata: Optional[dict] = None) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown index format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.metadata = dict(metadata or {})
+        self.count = 0
+        self.dim = 0
+        self._scales: List[float] = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if fmt == "json":
+            self._targets = [path]
+            self._main = open(f"{path}.partial", "w", encoding="utf-8")
+            self._main.write('{"chunks": [')
+            self._records = None
+        else:
+            self._targets = list(sidecar_paths(path))
+            self._main = open(f"{self._targets[0]}.partial", "wb")
+            self._records = open(f"{self._targets[1]}.partial", "w", encoding="utf-8")
+
+    def add(self, entry: dict) -> None:
+        vector = entry["embedding"]
+        if not self.count:
+            self.dim = len(vector)
+        elif len(vector) != self.dim:
+            raise ValueError(f"Chunk {entry['id']} has dimension {len(vector)}, expected {self.dim}")
+
+        if self.fmt == "json":
+            self._main.write(("," if self.count else "") + json.dumps(entry))
+        else:
+            data, scale = encode_vector(vector, self.fmt)
+            self._main.write(data)
+            if scale is not None:
+                self._scales.append(scale)
+            record = {field: entry[field] for field in METADATA_FIELDS}
+            self._records.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def _write_sidecar(self) -> None:
+        header = {
+            **self.metadata,
+            "format": self.fmt,
+            "dim": self.dim or self.metadata.get("dim", 0),
+            "count": self.count,
+            "vectors": os.path.basename(self._targets[0]),
+        }
+        if self.fmt == "int8":
+            header["scales"] = self._scales
+        records_path = f"{self._targets[1]}.partial"
+        with open(f"{records_path}.tmp", "w", encoding="utf-8") as out, \
+                open(records_path, "r", encoding="utf-8") as records:
+            out.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "chunks": [')
+            for i, line in enumerate(records):
+                out.write(("," if i else "") + line.rstrip("\n"))
+            out.write("]}")
+        os.replace(f"{records_path}.tmp", records_path)
+
+    def close(self) -> List[str]:
+        """Finish the files, move them into place and return their paths."""
+        if self.fmt == "json":
+            if self.dim:
+                self.metadata["dim"] = self.dim
+            tail = json.dumps(self.metadata)[1:-1]
+            self._main.write("]" + (", " + tail if tail else "") + "}")
+            self._main.close()
+        else:
+            self._main.close()
+            self._records.close()
+            self._write_sidecar()
+        for target in self._targets:
+            os.replace(f"{target}.partial", target)
+        return list(self._targets)
+
+    def abort(self) -> None:
+        """Close the partial files without publishing them."""
+        self._main.close()
+        if self._records is not None:
+            self._records.close()
+
+    def __enter__(self) -> "IndexWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info: object) -> None:
+        if exc_type is not None:
+            self.abort()
+
+
+def write_index(path: str, entries: Iterable[dict], fmt: str = "json", metadata: Optional[dict] = None) -> List[str]:
+    """Write ``entries`` (dicts with an ``embedding`` list) and return the files written."""
+    with IndexWriter(path, fmt, metadata) as writer:
+        for entry in entries:
+            writer.add(entry)
+        return writer.close()
+
+
+def read_index(path: str) -> Tuple[Dict, List[dict]]:
+    """Load any supported format; returns ``(metadata, entries)`` with decoded embeddings.
+
+    ``path`` may be a JSON index, a ``.meta.json`` sidecar or a ``.bin`` blob.
+    """
+    blob_path, meta_path = sidecar_paths(path)
+    if path.endswith(".bin") or path.endswith(".meta.json"):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(blob_path, "rb") as f:
+            vectors = decode_vectors(f.read(), meta["format"], meta["dim"], meta.get("scales"))
+        entries = [dict(chunk, embedding=vector) for chunk, vector in zip(meta.pop("chunks"), vectors)]
+        return meta, entries
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data.pop("chunks", [])
+    data.setdefault("format", "json")
+    if entries:
+        data.setdefault("dim", len(entries[0]["embedding"]))
+    return data, entries
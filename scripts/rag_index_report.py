@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Compare RAG index formats by size and reconstruction error.
+
+Encodes an existing index in every supported format, decodes it again and
+reports the on-disk size (raw and gzipped) together with the error relative
+to the source vectors.
+
+Usage:
+    python scripts/rag_index_report.py [worker/src/rag_index.json] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import math
+import os
+import sys
+import tempfile
+from typing import Dict, List, Sequence
+
+from rag_index_format import FORMATS, read_index, write_index
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYOUT_KEYS = ("format", "dim", "count", "vectors", "scales")
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def reconstruction_error(original: List[List[float]], decoded: List[List[float]]) -> Dict[str, float]:
+    max_abs = 0.0
+    squared = 0.0
+    count = 0
+    cosines = []
+    for a, b in zip(original, decoded):
+        for x, y in zip(a, b):
+            diff = abs(x - y)
+            max_abs = max(max_abs, diff)
+            squared += diff * diff
+            count += 1
+        cosines.append(_cosine(a, b))
+    return {
+        "max_abs_error": max_abs,
+        "rmse": math.sqrt(squared / count) if count else 0.0,
+        "min_cosine": min(cosines, default=1.0),
+        "mean_cosine": sum(cosines) / len(cosines) if cosines else 1.0,
+    }
+
+
+def measure(index_path: str) -> List[Dict[str, object]]:
+    meta, entries = read_index(index_path)
+    original = [entry["embedding"] for entry in entries]
+    metadata = {key: value for key, value in meta.items() if key not in LAYOUT_KEYS}
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            out_path = os.path.join(tmp, f"index-{fmt}.json")
+            files = write_index(out_path, entries, fmt, metadata)
+            size = sum(os.path.getsize(p) for p in files)
+            gz_size = 0
+            for p in files:
+                with open(p, "rb") as f:
+                    gz_size += len(gzip.compress(f.read()))
+            _, decoded_entries = read_index(files[0])
+            row: Dict[str, object] = {"format": fmt, "bytes": size, "gzip_bytes": gz_size}
+            row.update(reconstruction_error(original, [e["embedding"] for e in decoded_entries]))
+            rows.append(row)
+    return rows
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    baseline = rows[0]["bytes"] or 1
+    print(f"{'format':<6} {'size KB':>9} {'gzip KB':>9} {'ratio':>6} {'max |err|':>10} {'rmse':>10} {'min cos':>9}")
+    for row in rows:
+        print(
+            f"{row['format']:<6} {row['bytes'] / 1024:>9.1f} {row['gzip_bytes'] / 1024:>9.1f} "
+            f"{row['bytes'] / baseline:>6.2f} {row['max_abs_error']:>10.2e} {row['rmse']:>10.2e} "
+            f"{row['min_cosine']:>9.6f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report size and reconstruction error per RAG index format.")
+    parser.add_argument("index", nargs="?", default=os.path.join(ROOT, "worker", "src", "rag_index.json"))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON instead of a table.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        print(f"Index not found: {args.index}", file=sys.stderr)
+        return 1
+
+    rows = measure(args.index)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""BM25 inverted index stored inside the RAG index artifact.
+
+``build_rag_index.py`` feeds each chunk's title and text to :class:`Bm25Builder` as it
+is written and stores the result under the index's ``lexical`` key (in the
+JSON index, or the ``.meta.json`` sidecar for compact formats)::
+
+    {"type": "bm25", "k1": 1.2, "b": 0.75, "n": 120, "avgdl": 87.4,
+     "doc_len": [91, 40, ...],                    # terms per chunk, row order
+     "postings": {"mcts": [3, 2, 14, 1, ...]}}    # (row gap, tf) pairs
+
+Terms are lower-cased ``\\w+`` runs minus a short stop-word list.  Row ids in
+each posting list are gap-encoded, which keeps the section small, and
+document frequency is just half the list length, so a lookup touches only the
+query's own terms.  Keyword queries (paper titles, "MCTS", contact details)
+can be answered from it directly or fused with vector scores via
+:func:`reciprocal_rank_fusion`.
+
+Usage:
+    python scripts/rag_lexical.py "monte carlo tree search" "email"   # top-k per query
+    python scripts/rag_lexical.py --eval                             # title->chunk recall, MRR, latency
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX = os.path.join(ROOT, "worker", "src", "rag_index.json")
+
+TERM_RE = re.compile(r"\w+")
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have he his in is it its of on or that the this to was were
+what which who will with how do does i me my you your about
+""".split())
+
+
+def terms(text: str) -> List[str]:
+    return [term for term in TERM_RE.findall(text.lower()) if term not in STOP_WORDS]
+
+
+class Bm25Builder:
+    """Accumulate postings chunk by chunk, in index row order."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.doc_len: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._last_row: Dict[str, int] = {}
+
+    def add(self, text: str) -> None:
+        row = len(self.doc_len)
+        counts: Dict[str, int] = {}
+        for term in terms(text):
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            postings = self._postings.setdefault(term, [])
+            postings += (row - self._last_row.get(term, 0), tf)
+            self._last_row[term] = row
+        self.doc_len.append(sum(counts.values()))
+
+    def to_json(self) -> Dict:
+        n = len(self.doc_len)
+        return {
+            "type": "bm25",
+            "k1": self.k1,
+            "b": self.b,
+            "n": n,
+            "avgdl": round(sum(self.doc_len) / n, 3) if n else 0.0,
+            "doc_len": self.doc_len,
+            "postings": dict(sorted(self._postings.items())),
+        }
+
+
+class Bm25Index:
+    """Query-time view of the ``lexical`` section."""
+
+    def __init__(self, data: Dict) -> None:
+        if data.get("type") != "bm25":
+            raise ValueError(f"Unsupported lexical index type: {data.get('type')!r}")
+        self.k1 = data["k1"]
+        self.b = data["b"]
+        self.n = data["n"]
+        self.avgdl = data["avgdl"] or 1.0
+        self.postings = data["postings"]
+        # Per-row length normalisation is query independent: k1 * (1 - b + b * dl / avgdl).
+        self._norm = [self.k1 * (1 - self.b + self.b * dl / self.avgdl) for dl in data["doc_len"]]
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ())) // 2
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for term in set(terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            row = 0
+            for i in range(0, len(postings), 2):
+                row += postings[i]
+                tf = postings[i + 1]
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + self._norm[row])
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[int, float]]:
+        """Top-k ``(row, bm25)`` pairs; empty when no query term is indexed."""
+        return heapq.nlargest(k, self.scores(query).items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Tuple[int, float]]], k: int = 4, c: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked ``(row, score)`` lists by summing ``1 / (c + rank)``."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (row, _) in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (c + rank)
+    return heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+
+
+def load(path: str) -> Tuple[Bm25Index, List[dict]]:
+    """Read the lexical section and chunk records (without decoding vectors)."""
+    if path.endswith(".bin"):
+        path = path[: -len(".bin")] + ".meta.json"
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "lexical" not in data:
+        raise SystemExit(f"ERROR: {path} has no lexical index; rebuild with build_rag_index.py.")
+    return Bm25Index(data["lexical"]), data["chunks"]
+
+
+def evaluate(index: Bm25Index, chunks: List[dict], k: int = 4) -> Dict[str, float]:
+    """Use each chunk's title as a query; report recall@k, MRR and latency.
+
+    Several chunks can share a title (split documents), so a hit is any row
+    whose chunk carries the query's title.
+    """
+    rows_by_title: Dict[str, set] = {}
+    for row, chunk in enumerate(chunks):
+        rows_by_title.setdefault(chunk.get("title", ""), set()).add(row)
+    queries = [title for title in rows_by_title if terms(title)]
+    hits = 0
+    reciprocal_ranks = 0.0
+    latencies = []
+    for title in queries:
+        started = time.perf_counter()
+        ranked = index.search(title, k)
+        latencies.append(time.perf_counter() - started)
+        for rank, (row, _) in enumerate(ranked, start=1):
+            if row in rows_by_title[title]:
+                hits += 1
+                reciprocal_ranks += 1 / rank
+                break
+    latencies.sort()
+    count = max(1, len(queries))
+    return {
+        "queries": len(queries),
+        f"recall@{k}": round(hits / count, 4),
+        "mrr": round(reciprocal_ranks / count, 4),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "terms": len(index.postings),
+        "bytes": len(json.dumps({"postings": index.postings}, separators=(",", ":"))),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query or evaluate the BM25 section of the RAG index.")
+    parser.add_argument("queries", nargs="*", help="Query texts.")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index path (.json, .meta.json or .bin).")
+    parser.add_argument("-k", type=int, default=4, help="Number of chunks to return per query.")
+    parser.add_argument("--eval", action="store_true", help="Score every chunk title as a query.")
+    args = parser.parse_args()
+
+    index, chunks = load(args.index)
+    if args.eval:
+        print(json.dumps(evaluate(index, chunks, args.k), indent=2))
+        return 0
+    if not args.queries:
+        parser.error("give at least one query, or --eval")
+    for query in args.queries:
+        started = time.perf_counter()
+        ranked = index.search(query, args.k)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n{query!r} ({elapsed:.3f} ms)")
+        if not ranked:
+            print("  no matching terms")
+        for row, score in ranked:
+            print(f"  {score:7.3f}  {chunks[row]['id']}: {chunks[row]['title']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Precomputed answers to anticipated chatbot queries.
+
+Most chatbot traffic is a handful of questions.  ``build_rag_index.py
+--queries FILE`` embeds each line of ``FILE`` once (through the embedding
+cache) and, while the chunks stream into the index, keeps a running top-k of
+cosine matches per query.  The result is stored under the index's
+``anticipated`` key, keyed by normalized query text::
+
+    {"k": 4, "queries": {"where did he study": [["profile-education", 0.82], ...]}}
+
+Because the table lives in the same artifact as the chunks and is recomputed
+on every build, it can never point at chunks that have since changed.  The
+Worker looks a query up here first and skips the embedding call and the
+similarity scan on a hit.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+QUERY_TERM_RE = re.compile(r"\w+")
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case word runs joined by single spaces (mirrored by ``normalizeQuery`` in the Worker)."""
+    return " ".join(QUERY_TERM_RE.findall(text.lower()))
+
+
+def read_queries(path: str) -> List[str]:
+    """One query per line; blank lines and ``#`` comments are ignored, duplicates dropped."""
+    queries: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and normalize_query(line):
+                queries.setdefault(normalize_query(line), line)
+    return list(queries.values())
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class AnticipatedQueries:
+    """Running top-k cosine matches for a fixed set of query vectors."""
+
+    def __init__(self, queries: Sequence[str], vectors: Sequence[Optional[Sequence[float]]], k: int = 4) -> None:
+        self.k = k
+        self._queries = [
+            (normalize_query(query), _unit(vector)) for query, vector in zip(queries, vectors) if vector
+        ]
+        self._heaps: List[List[Tuple[float, str]]] = [[] for _ in self._queries]
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def add(self, chunk_id: str, vector: Sequence[float]) -> None:
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        for (_, query), heap in zip(self._queries, self._heaps):
+            score = sum(q * v for q, v in zip(query, vector)) / norm
+            if len(heap) < self.k:
+                heapq.heappush(heap, (score, chunk_id))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, chunk_id))
+
+    def to_json(self) -> Dict:
+        return {
+            "k": self.k,
+            "queries": {
+                key: [[chunk_id, round(score, 4)] for score, chunk_id in sorted(heap, reverse=True)]
+                for (key, _), heap in zip(self._queries, self._heaps)
+            },
+        }
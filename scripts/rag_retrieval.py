@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Vectorized local retrieval over the RAG index.
+
+Loads any index written by ``build_rag_index.py`` (JSON or a packed blob
+with its ``.meta.json`` sidecar) once into a contiguous, row-normalized
+float32 matrix and answers single or batched queries with one matrix
+product plus ``argpartition`` top-k, mirroring the Worker's cosine ranking.
+
+Usage:
+    export GEMINI_API_KEY="your-key"
+    python scripts/rag_retrieval.py "What is Ibrahim researching?" "How do I contact him?"
+    python scripts/rag_retrieval.py --chunk-id profile-education -k 3   # offline, no API call
+
+Requires NumPy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag_index_format import read_index, sidecar_paths
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX = os.path.join(ROOT, "worker", "src", "rag_index.json")
+BLOB_DTYPES = {"f32": "<f4", "f16": "<f2", "int8": "i1"}
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class RagIndex:
+    """In-memory index: chunk metadata plus an ``(n, dim)`` unit-row matrix."""
+
+    def __init__(self, meta: Dict, chunks: List[dict], matrix: np.ndarray) -> None:
+        self.meta = meta
+        self.chunks = chunks
+        self.ids = [chunk["id"] for chunk in chunks]
+        self.matrix = np.ascontiguousarray(_unit_rows(matrix.astype(np.float32, copy=False)))
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @classmethod
+    def load(cls, path: str) -> "RagIndex":
+        if path.endswith(".bin") or path.endswith(".meta.json"):
+            blob_path, meta_path = sidecar_paths(path)
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            chunks = meta.pop("chunks")
+            fmt = meta["format"]
+            matrix = np.fromfile(blob_path, dtype=BLOB_DTYPES[fmt]).reshape(meta["count"], meta["dim"])
+            matrix = matrix.astype(np.float32)
+            if fmt == "int8":
+                matrix *= np.asarray(meta["scales"], dtype=np.float32)[:, None]
+            return cls(meta, chunks, matrix)
+
+        meta, entries = read_index(path)
+        matrix = np.array([entry.pop("embedding") for entry in entries], dtype=np.float32)
+        return cls(meta, entries, matrix.reshape(len(entries), -1))
+
+    def search(self, queries: np.ndarray, k: int = 4) -> List[List[Tuple[int, float]]]:
+        """Top-k ``(row, cosine)`` pairs for each query vector (1-D or 2-D input)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {self.dim}")
+        scores = _unit_rows(queries) @ self.matrix.T
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(int(row), float(score)) for row, score in zip(rows, row_scores)]
+            for rows, row_scores in zip(top, top_scores)
+        ]
+
+    def vector_for(self, chunk_id: str) -> np.ndarray:
+        return self.matrix[self.ids.index(chunk_id)]
+
+
+def embed_queries(texts: Sequence[str], index: RagIndex, api_base: Optional[str]) -> np.ndarray:
+    """Embed query texts with the backend recorded in the index metadata."""
+    from embedding_backends import backend_for_index
+
+    try:
+        backend = backend_for_index(index.meta, api_base=api_base)
+    except ValueError as error:
+        raise SystemExit(f"ERROR: {error} (or use --chunk-id).")
+    with backend:
+        vectors = backend.embed_many(list(texts))
+    if any(vector is None for vector in vectors):
+        raise SystemExit("ERROR: Query embedding failed.")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the RAG index locally and time retrieval.")
+    parser.add_argument("queries", nargs="*", help="Query texts (embedded with the index's backend).")
+    parser.add_argument("--chunk-id", action="append", default=[],
+                        help="Use an indexed chunk's own vector as a query (repeatable, no API call).")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Index path (.json, .meta.json or .bin).")
+    parser.add_argument("-k", type=int, default=4, help="Number of chunks to return per query.")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Repeat each search this many times and report the mean latency.")
+    parser.add_argument("--api-base", default=None, help="Override the Gemini API base URL.")
+    args = parser.parse_args()
+
+    if not args.queries and not args.chunk_id:
+        parser.error("give at least one query or --chunk-id")
+
+    started = time.perf_counter()
+    index = RagIndex.load(args.index)
+    load_ms = (time.perf_counter() - started) * 1000
+    print(f"Loaded {len(index)} chunks x {index.dim} dims in {load_ms:.1f} ms")
+
+    labels = list(args.queries) + [f"[chunk] {chunk_id}" for chunk_id in args.chunk_id]
+    vectors = []
+    if args.queries:
+        started = time.perf_counter()
+        vectors.append(embed_queries(args.queries, index, args.api_base))
+        print(f"Embedded {len(args.queries)} queries in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.chunk_id:
+        vectors.append(np.stack([index.vector_for(chunk_id) for chunk_id in args.chunk_id]))
+    queries = np.concatenate(vectors)
+
+    for label, query in zip(labels, queries):
+        started = time.perf_counter()
+        for _ in range(max(1, args.repeat)):
+            (hits,) = index.search(query, args.k)
+        latency_ms = (time.perf_counter() - started) * 1000 / max(1, args.repeat)
+        print(f"\n{label}  ({latency_ms:.3f} ms)")
+        for rank, (row, score) in enumerate(hits, start=1):
+            chunk = index.chunks[row]
+            print(f"  {rank}. {score:.3f}  {chunk['id']}  {chunk['title'][:60]}")
+
+    if len(queries) > 1:
+        started = time.perf_counter()
+        for _ in range(max(1, args.repeat)):
+            index.search(queries, args.k)
+        batch_ms = (time.perf_counter() - started) * 1000 / max(1, args.repeat)
+        print(f"\nBatched search of {len(queries)} queries: {batch_ms:.3f} ms "
+              f"({batch_ms / len(queries):.3f} ms/query)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
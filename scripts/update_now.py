@@ -1,19 +1,102 @@
+import argparse
+import json
 import os
+import time
 import requests
 import yaml
 from datetime import datetime
+from urllib.parse import urlsplit
+
+import instrumentation
 
 # Configuration
 REPO = "Ibrahimkhan4real/ibrahimkhan4real.github.io"
 ISSUE_LABEL = "current-status"
 DATA_FILE = "_data/now.yml"
+API_ROOT = "https://api.github.com"
+CACHE_FILE = ".cache/github_api.json"
+
+
+class GitHubClient:
+    """Minimal GitHub REST client: pooled session, optional token, pagination and ETag caching.
+
+    Responses are cached on disk with their ETag; a repeat request sends
+    ``If-None-Match`` and a ``304 Not Modified`` (which GitHub does not count
+    against the rate limit) is answered from the cache.
+    """
+
+    def __init__(self, token=None, cache_path=CACHE_FILE, timeout=30):
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": REPO,
+        })
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.cache = {}
+        self.dirty = False
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path) as f:
+                    self.cache = json.load(f)
+            except ValueError:
+                self.cache = {}
+
+    def get(self, url, params=None):
+        """GET ``url`` and return ``(data, next_url)``, revalidating any cached copy."""
+        request = requests.Request("GET", url, params=params).prepare()
+        key = request.url
+        cached = self.cache.get(key)
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+
+        started = time.perf_counter()
+        response = self.session.get(key, headers=headers, timeout=self.timeout)
+        instrumentation.current().record_http(
+            urlsplit(key).netloc, response.status_code, time.perf_counter() - started, 0, len(response.content)
+        )
+        if response.status_code == 304 and cached:
+            instrumentation.current().count("github_not_modified")
+            return cached["data"], cached.get("next")
+        response.raise_for_status()
+
+        data = response.json()
+        next_url = response.links.get("next", {}).get("url")
+        if response.headers.get("ETag"):
+            self.cache[key] = {"etag": response.headers["ETag"], "data": data, "next": next_url}
+            self.dirty = True
+        return data, next_url
 
-def fetch_latest_issue():
-    url = f"https://api.github.com/repos/{REPO}/issues?labels={ISSUE_LABEL}&state=open"
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200 and response.json():
-        return response.json()[0]
+    def paginate(self, path, params=None):
+        """Yield every item of a list endpoint, following ``Link: rel="next"`` lazily."""
+        url = f"{API_ROOT}{path}"
+        while url:
+            items, url = self.get(url, params)
+            params = None  # the next link already carries the query
+            yield from items
+
+    def save(self):
+        if not self.cache_path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+    def close(self):
+        self.save()
+        self.session.close()
+
+
+def fetch_latest_issue(client):
+    params = {"labels": ISSUE_LABEL, "state": "open", "sort": "created", "direction": "desc", "per_page": 100}
+    for issue in client.paginate(f"/repos/{REPO}/issues", params):
+        if "pull_request" not in issue:  # the issues endpoint also lists pull requests
+            return issue
     return None
 
 def update_now_data(issue):
@@ -21,6 +104,15 @@ def update_now_data(issue):
         print("No open issue with label 'current-status' found.")
         return
 
+    try:
+        with open(DATA_FILE) as f:
+            current = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        current = {}
+    if current.get("content") == issue["body"] and current.get("issue_url") == issue["html_url"]:
+        print(f"{DATA_FILE} already matches issue: {issue['title']}")
+        return
+
     data = {
         "updated": datetime.now().strftime("%B %Y"),
         "content": issue["body"],
@@ -31,6 +123,24 @@ def update_now_data(issue):
         yaml.dump(data, f)
     print(f"Updated {DATA_FILE} with content from issue: {issue['title']}")
 
+def main():
+    parser = argparse.ArgumentParser(description=f"Update {DATA_FILE} from the latest '{ISSUE_LABEL}' issue.")
+    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"),
+                        help="GitHub token (default: $GITHUB_TOKEN); raises the API rate limit.")
+    parser.add_argument("--cache", default=CACHE_FILE, help="ETag response cache for the GitHub API.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use or update the response cache.")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumentation.session("update_now", args.report, args.profile):
+        client = GitHubClient(args.token, None if args.no_cache else args.cache)
+        try:
+            with instrumentation.stage("fetch"):
+                latest_issue = fetch_latest_issue(client)
+        finally:
+            client.close()
+        with instrumentation.stage("write"):
+            update_now_data(latest_issue)
+
 if __name__ == "__main__":
-    latest_issue = fetch_latest_issue()
-    update_now_data(latest_issue)
+    main()
@@ -1,25 +1,62 @@
 #!/usr/bin/env python3
 """Fetch the latest publications from Google Scholar and store them as JSON.
 
+Pages are fetched over one keep-alive :class:`http_session.HttpSession`
+with gzip and, unless ``--no-cache``, ETag/Last-Modified revalidation
+against a local response cache.  Each page is parsed as it streams in and
+parsing stops once the publication table ends.  The output file is only
+rewritten when the publication list actually changed; it is written minified
+together with a content-hashed, precompressed copy named by the directory's
+``manifest.json`` (see :mod:`artifacts`).  With ``--merge``
+publications are matched to the existing file by a stable key (the Scholar
+citation id in the link, else the normalized title), fields added by hand are
+kept, and a change-set of added, removed and re-cited papers is written next
+to the output so downstream steps can process just the delta (a run that
+changes nothing removes the previous change-set).
+
+Requests are paced by a per-host :class:`http_session.HostRateLimiter`
+(``--rpm``, with ``--jitter``) instead of fixed sleeps.  Given several Scholar
+ids, authors are fetched concurrently on ``--workers`` threads that share the
+session and its limiter, so a 429 backs off every worker and total wall time
+follows the request budget rather than the number of authors.  Each author
+is written to ``--output-dir/<id>.json`` and the union, with co-authored
+papers listed once, to ``--output``.
+
 Usage:
     python scripts/update_papers.py --scholar-id bh9os08AAAAJ
+    python scripts/update_papers.py --scholar-id bh9os08AAAAJ AbCdEfGAAAAJ --merge --rpm 30
+    python scripts/update_papers.py --scholar-ids-file group.txt --output site_data/group.json
 """
 
 from __future__ import annotations
 
 import argparse
+import codecs
 import datetime as dt
+import http.client
 import json
 import pathlib
+import re
 import sys
 import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from html.parser import HTMLParser
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import artifacts
+import instrumentation
+from http_session import HostRateLimiter, HttpError, HttpSession, ResponseCache
 
 
 SCHOLAR_ROOT = "https://scholar.google.com"
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+FIRST_ROW_RE = re.compile(r"<tr\b[^>]*\bgsc_a_tr\b")
+PENDING_TAIL = 512  # enough to hold a partially received ``<tr ...>`` between chunks
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
+)
 
 
 def build_url(scholar_id: str, start: int) -> str:
@@ -35,20 +72,60 @@ def build_url(scholar_id: str, start: int) -> str:
 
 
 class ScholarPageParser(HTMLParser):
-    """Minimal, dependency-free parser for Google Scholar publication tables."""
+    """Minimal, dependency-free parser for Google Scholar publication tables.
+
+    With ``fast=True`` (the default) nothing before the first ``gsc_a_tr`` row
+    is tokenized, and :attr:`done` is set once the publication table closes so
+    callers can stop feeding.  The page may be fed in arbitrary chunks.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, fast: bool = True) -> None:
         super().__init__()
         self._entries: List[Dict[str, Optional[str]]] = []
         self._current: Optional[Dict[str, Optional[str]]] = None
         self._capture: Optional[str] = None
         self._gray_count: int = 0
+        self._fast = fast
+        self._started = not fast
+        self._pending = ""
+        self._text: List[str] = []
+        self.done = False
 
     @property
     def entries(self) -> List[Dict[str, Optional[str]]]:
         return self._entries
 
+    def feed(self, data: str) -> None:
+        if self.done:
+            return
+        if not self._started:
+            data = self._pending + data
+            match = FIRST_ROW_RE.search(data)
+            if match is None:
+                self._pending = data[-PENDING_TAIL:]
+                return
+            self._started = True
+            self._pending = ""
+            data = data[match.start():]
+        super().feed(data)
+
+    def _flush_text(self) -> None:
+        # A text node can arrive in pieces when the page is fed in chunks; join them first.
+        text = "".join(self._text).strip()
+        self._text = []
+        if not text or not self._capture or not self._current:
+            return
+        current_value = self._current.get(self._capture)
+        if current_value:
+            self._current[self._capture] = f"{current_value} {text}"
+        else:
+            self._current[self._capture] = text
+
     def handle_starttag(self, tag: str, attrs: List[tuple[str, Optional[str]]]) -> None:
+        if self._text:
+            self._flush_text()
+        if self.done or (self._current is None and tag != "tr"):
+            return
         attr_map = {name: value or "" for name, value in attrs}
         classes = set(attr_map.get("class", "").split())
 
@@ -83,48 +160,93 @@ class ScholarPageParser(HTMLParser):
         self._capture = None
 
     def handle_endtag(self, tag: str) -> None:
+        if self._text:
+            self._flush_text()
         if tag == "tr" and self._current is not None:
             self._entries.append(self._current)
             self._current = None
+        elif self._fast and tag in {"tbody", "table"}:
+            self.done = True
         if self._capture and tag in {"a", "div", "span"}:
             self._capture = None
 
     def handle_data(self, data: str) -> None:
-        if not self._capture or not self._current:
-            return
-        text = data.strip()
-        if not text:
+        if self.done or not self._capture or not self._current:
             return
-        current_value = self._current.get(self._capture)
-        if current_value:
-            self._current[self._capture] = f"{current_value} {text}"
-        else:
-            self._current[self._capture] = text
-
-
-def fetch_page(url: str, delay: float = 1.0) -> str:
-    """Download a single Scholar result page."""
-    time.sleep(delay)  # keep it friendly
-    request = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-        },
+        self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        if self._text:
+            self._flush_text()
+
+
+def make_session(
+    timeout: float = 30.0,
+    cache_dir: Optional[pathlib.Path] = None,
+    rate_limiter: Optional[HostRateLimiter] = None,
+) -> HttpSession:
+    cache = ResponseCache(str(cache_dir)) if cache_dir else None
+    return HttpSession(
+        timeout=timeout,
+        max_retries=3,
+        rate_limiter=rate_limiter,
+        headers={"User-Agent": USER_AGENT},
+        cache=cache,
     )
-    with urllib.request.urlopen(request) as response:  # noqa: S310 (urllib is fine here)
-        return response.read().decode("utf-8")
 
 
-def collect_publications(scholar_id: str) -> List[Dict[str, Optional[str]]]:
+def fetch_page(session: HttpSession, url: str, delay: float = 1.0) -> str:
+    """Download a single Scholar result page."""
+    with instrumentation.stage("throttle"):
+        time.sleep(delay)  # keep it friendly
+    return session.get(url).text()
+
+
+def stream_entries(session: HttpSession, url: str, delay: float = 1.0) -> List[Dict[str, Optional[str]]]:
+    """Parse a Scholar result page while it downloads, stopping at the end of the table."""
+    with instrumentation.stage("throttle"):
+        time.sleep(delay)
+    parser = ScholarPageParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chunks = session.stream(url)
+    try:
+        for chunk in instrumentation.current().timed_iter("fetch", chunks):
+            with instrumentation.stage("parse"):
+                parser.feed(decoder.decode(chunk))
+            if parser.done:
+                break
+    finally:
+        chunks.close()
+    with instrumentation.stage("parse"):
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    return parser.entries
+
+
+def collect_publications(
+    scholar_id: str, session: HttpSession, stream: bool = True, page_delay: float = 0.75
+) -> List[Dict[str, Optional[str]]]:
+    """Every publication of one author, one 100-row page at a time.
+
+    ``page_delay`` is slept before each page after the first; pass 0 when the
+    session's rate limiter already paces requests.
+    """
     publications: List[Dict[str, Optional[str]]] = []
     start = 0
     while True:
         url = build_url(scholar_id, start)
-        html = fetch_page(url, delay=0.75 if start else 0.0)
-        parser = ScholarPageParser()
-        parser.feed(html)
-        batch = [entry for entry in parser.entries if entry.get("title")]
+        delay = page_delay if start else 0.0
+        if stream:
+            entries = stream_entries(session, url, delay)
+        else:
+            with instrumentation.stage("fetch"):
+                html = fetch_page(session, url, delay)
+            with instrumentation.stage("parse"):
+                parser = ScholarPageParser(fast=False)
+                parser.feed(html)
+            entries = parser.entries
+        batch = [entry for entry in entries if entry.get("title")]
         if not batch:
             break
         publications.extend(batch)
@@ -150,36 +272,311 @@ def normalize_entry(entry: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]
     return cleaned
 
 
+def publication_key(entry: Dict[str, Optional[str]]) -> str:
+    """Stable identity for a publication: Scholar citation id, else link, else normalized title."""
+    link = entry.get("link") or ""
+    if link:
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(link).query)
+        citation = query.get("citation_for_view")
+        return f"scholar:{citation[0]}" if citation else f"link:{link}"
+    return f"title:{title_key(entry)}"
+
+
+def title_key(entry: Dict[str, Optional[str]]) -> str:
+    return " ".join(re.findall(r"\w+", (entry.get("title") or "").lower()))
+
+
+def merge_publications(
+    existing: List[Dict[str, Optional[str]]], fresh: List[Dict[str, Optional[str]]]
+) -> Tuple[List[Dict[str, Optional[str]]], Dict[str, list]]:
+    """Merge ``fresh`` Scholar entries into ``existing`` ones; returns ``(publications, changes)``.
+
+    The fresh list decides membership and order.  A matched publication keeps
+    any extra fields of its existing entry, with Scholar's fields updated.
+    """
+    by_key = {publication_key(entry): entry for entry in existing}
+    by_title = {title_key(entry): entry for entry in existing if entry.get("title")}
+    matched = set()
+    merged = []
+    changes: Dict[str, list] = {"added": [], "removed": [], "citations_changed": [], "updated": []}
+    for entry in fresh:
+        key = publication_key(entry)
+        previous = by_key.get(key) or by_title.get(title_key(entry))
+        if previous is None or id(previous) in matched:
+            merged.append(entry)
+            changes["added"].append({"key": key, **entry})
+            continue
+        matched.add(id(previous))
+        merged.append({**previous, **entry})
+        if previous.get("citations") != entry.get("citations"):
+            changes["citations_changed"].append({
+                "key": key,
+                "title": entry.get("title"),
+                "before": previous.get("citations"),
+                "after": entry.get("citations"),
+            })
+        fields = sorted(field for field, value in entry.items() if field != "citations" and previous.get(field) != value)
+        if fields:
+            changes["updated"].append({"key": key, "title": entry.get("title"), "fields": fields})
+    for entry in existing:
+        if id(entry) not in matched:
+            changes["removed"].append({"key": publication_key(entry), **entry})
+    return merged, changes
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Update the papers.json file from Google Scholar.")
-    parser.add_argument("--scholar-id", required=True, help="Google Scholar user identifier (e.g. bh9os08AAAAJ)")
+    parser.add_argument(
+        "--scholar-id",
+        nargs="+",
+        help="Google Scholar user identifier(s) (e.g. bh9os08AAAAJ); several ids enable batch mode.",
+    )
+    parser.add_argument(
+        "--scholar-ids-file",
+        type=pathlib.Path,
+        help="File with one Scholar id per line (# comments allowed), added to --scholar-id.",
+    )
     parser.add_argument(
         "--output",
-        default=pathlib.Path(__file__).resolve().parent.parent / "site_data" / "papers.json",
+        default=ROOT / "site_data" / "papers.json",
         type=pathlib.Path,
-        help="Destination for the generated JSON file.",
+        help="Destination for the generated JSON file (the combined dataset in batch mode).",
     )
+    parser.add_argument(
+        "--output-dir",
+        default=ROOT / "site_data" / "authors",
+        type=pathlib.Path,
+        help="Batch mode: directory for the per-author <scholar id>.json files.",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Batch mode: authors fetched concurrently.")
+    parser.add_argument(
+        "--rpm", type=float, default=60, help="Requests per minute per host, shared by all workers (0 = unlimited)."
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.25, help="Randomize the gap between requests by up to this fraction."
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+    parser.add_argument(
+        "--cache-dir",
+        default=ROOT / ".cache" / "http",
+        type=pathlib.Path,
+        help="Conditional-request response cache (default: .cache/http).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch full pages.")
+    parser.add_argument(
+        "--no-stream", action="store_true", help="Download each page fully, then parse all of it."
+    )
+    parser.add_argument(
+        "--merge", action="store_true", help="Merge into the existing output and write a change-set file."
+    )
+    parser.add_argument(
+        "--changes",
+        default=None,
+        type=pathlib.Path,
+        help="Change-set destination for --merge (default: <output stem>.changes.json; per author in batch mode).",
+    )
+    instrumentation.add_arguments(parser)
     args = parser.parse_args()
 
-    publications = [normalize_entry(entry) for entry in collect_publications(args.scholar_id)]
-    generated_at = (
-        dt.datetime.now(dt.timezone.utc)
-        .replace(microsecond=0)
-        .isoformat()
-        .replace("+00:00", "Z")
-    )
+    with instrumentation.session("update_papers", args.report, args.profile):
+        return run(args)
+
+
+def load_existing(path: pathlib.Path) -> Dict[str, object]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def unchanged(existing: Dict[str, object], payload: Dict[str, object]) -> bool:
+    """True when ``existing`` already holds ``payload`` apart from its timestamp."""
+    if not existing:
+        return False
+    keys = set(existing) | set(payload)
+    keys.discard("generated_at")
+    return all(existing.get(key) == payload.get(key) for key in keys)
+
+
+def write_json(path: pathlib.Path, payload: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def utc_timestamp() -> str:
+    return dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def write_author(
+    scholar_id: str,
+    entries: List[Dict[str, Optional[str]]],
+    output: pathlib.Path,
+    merge: bool,
+    changes_path: Optional[pathlib.Path],
+    generated_at: str,
+) -> Tuple[Dict[str, object], Optional[Dict[str, int]]]:
+    """Write one author's dataset (and change-set with ``merge``); returns ``(payload on disk, change counts)``."""
+    publications = [normalize_entry(entry) for entry in entries]
+    existing = load_existing(output)
+    changes = None
+    if merge:
+        publications, changes = merge_publications(list(existing.get("publications") or []), publications)
 
     payload = {
         "source": "Google Scholar",
-        "scholar_id": args.scholar_id,
+        "scholar_id": scholar_id,
+        "generated_at": generated_at,
+        "count": len(publications),
+        "publications": publications,
+    }
+
+    if changes is not None:
+        changes_path = changes_path or output.with_name(f"{output.stem}.changes.json")
+    if unchanged(existing, payload):
+        with instrumentation.stage("serialize"):
+            artifacts.publish(output, existing, logical=False)
+            if changes is not None:
+                # Nothing changed: drop the previous run's delta so downstream steps do not replay it.
+                changes_path.unlink(missing_ok=True)
+        print(f"{output} is up to date ({len(publications)} publications); not rewriting")
+        return existing, None if changes is None else {name: 0 for name in changes}
+
+    with instrumentation.stage("serialize"):
+        entry = artifacts.publish(output, payload)
+        if changes is not None:
+            write_json(changes_path, {
+                "generated_at": generated_at,
+                "previous_generated_at": existing.get("generated_at"),
+                **changes,
+            })
+    print(f"Wrote {len(publications)} publications to {output} ({entry['file']}, {entry['gzip_bytes']} bytes gzipped)")
+    if changes is None:
+        return payload, None
+    summary = ", ".join(f"{len(items)} {name.replace('_', ' ')}" for name, items in changes.items())
+    print(f"Changes: {summary} (see {changes_path})")
+    return payload, {name: len(items) for name, items in changes.items()}
+
+
+def fetch_authors(
+    scholar_ids: Sequence[str], session: HttpSession, stream: bool, workers: int, page_delay: float
+) -> Dict[str, Optional[List[Dict[str, Optional[str]]]]]:
+    """Collect several authors concurrently; a failed author maps to None.
+
+    Pacing comes from the session's per-host rate limiter, which every worker
+    shares, so wall time follows the request budget rather than the number of
+    authors.
+    """
+
+    def fetch(scholar_id: str) -> Optional[List[Dict[str, Optional[str]]]]:
+        try:
+            return collect_publications(scholar_id, session, stream, page_delay)
+        except (HttpError, http.client.HTTPException, OSError) as error:
+            print(f"ERROR: could not fetch {scholar_id}: {error}", file=sys.stderr)
+            instrumentation.current().count("author_errors")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(scholar_ids)))) as pool:
+        return dict(zip(scholar_ids, pool.map(fetch, scholar_ids)))
+
+
+def combine_authors(payloads: Dict[str, Dict[str, object]], generated_at: str) -> Dict[str, object]:
+    """One dataset over several authors; a shared paper is listed once with every author's id.
+
+    Scholar citation ids differ per author, so co-authored papers are also
+    matched by normalized title.
+    """
+    publications: List[Dict[str, object]] = []
+    by_key: Dict[str, Dict[str, object]] = {}
+    for scholar_id, payload in payloads.items():
+        for entry in payload.get("publications") or []:
+            keys = [publication_key(entry)]
+            if title_key(entry):
+                keys.append(f"title:{title_key(entry)}")
+            combined = next((by_key[key] for key in keys if key in by_key), None)
+            if combined is None:
+                combined = {**entry, "scholar_ids": []}
+                publications.append(combined)
+            if scholar_id not in combined["scholar_ids"]:
+                combined["scholar_ids"].append(scholar_id)
+            for key in keys:
+                by_key.setdefault(key, combined)
+    publications.sort(key=lambda entry: int(entry["year"]) if str(entry.get("year") or "").isdigit() else 0, reverse=True)
+    return {
+        "source": "Google Scholar",
+        "scholar_ids": list(payloads),
         "generated_at": generated_at,
         "count": len(publications),
         "publications": publications,
     }
 
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    args.output.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-    print(f"Wrote {len(publications)} publications to {args.output}")
+
+def read_scholar_ids(args: argparse.Namespace) -> List[str]:
+    scholar_ids = list(args.scholar_id or [])
+    if args.scholar_ids_file:
+        for line in args.scholar_ids_file.read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                scholar_ids.append(line)
+    return list(dict.fromkeys(scholar_ids))
+
+
+def run(args: argparse.Namespace) -> int:
+    scholar_ids = read_scholar_ids(args)
+    if not scholar_ids:
+        print("ERROR: give --scholar-id or --scholar-ids-file", file=sys.stderr)
+        return 2
+    limiter = HostRateLimiter(args.rpm, args.jitter)
+    # Without a request budget, fall back to a fixed pause between one author's pages.
+    page_delay = 0.0 if args.rpm > 0 else 0.75
+    generated_at = utc_timestamp()
+    metrics = instrumentation.current()
+
+    with make_session(args.timeout, None if args.no_cache else args.cache_dir, limiter) as session:
+        if len(scholar_ids) == 1:
+            entries = collect_publications(scholar_ids[0], session, not args.no_stream, page_delay)
+            fetched = {scholar_ids[0]: entries}
+        else:
+            fetched = fetch_authors(scholar_ids, session, not args.no_stream, args.workers, page_delay)
+
+    if len(scholar_ids) == 1:
+        payload, changes = write_author(
+            scholar_ids[0], fetched[scholar_ids[0]], args.output, args.merge, args.changes, generated_at
+        )
+        metrics.set("publications", payload.get("count", 0))
+        if changes is not None:
+            metrics.set("changes", changes)
+        return 0
+
+    payloads: Dict[str, Dict[str, object]] = {}
+    all_changes: Dict[str, Dict[str, int]] = {}
+    failed = []
+    for scholar_id, entries in fetched.items():
+        output = args.output_dir / f"{scholar_id}.json"
+        if entries is None:
+            # Keep the last good data for this author in the combined dataset.
+            failed.append(scholar_id)
+            payloads[scholar_id] = load_existing(output)
+            continue
+        payloads[scholar_id], changes = write_author(scholar_id, entries, output, args.merge, None, generated_at)
+        if changes is not None:
+            all_changes[scholar_id] = changes
+
+    combined = combine_authors(payloads, generated_at)
+    existing = load_existing(args.output)
+    with instrumentation.stage("serialize"):
+        if unchanged(existing, combined):
+            artifacts.publish(args.output, existing, logical=False)
+            print(f"{args.output} is up to date ({combined['count']} publications); not rewriting")
+        else:
+            entry = artifacts.publish(args.output, combined)
+            print(f"Wrote {combined['count']} publications from {len(payloads)} authors to {args.output} ({entry['file']})")
+    metrics.set("publications", combined["count"])
+    metrics.set("authors", {"total": len(scholar_ids), "failed": failed})
+    if all_changes:
+        metrics.set("changes", all_changes)
+    if failed:
+        print(f"ERROR: {len(failed)} of {len(scholar_ids)} authors failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
     return 0
 
 
@@ -12,10 +12,22 @@
 import RAG_INDEX from "./rag_index.json";
 
 const GEMINI_EMBED_MODEL = "models/gemini-embedding-001";
+const GEMINI_EMBED_DIMENSIONS = 3072;
 const GEMINI_CHAT_MODEL = "models/gemini-2.5-flash-lite";
 const TOP_K = 4;
 const MAX_HISTORY = 6; // max previous messages to keep for context
 
+// Index built with --dimensions / --normalize: request matching query vectors
+// and, for unit-length chunk vectors, score with a plain dot product.
+const INDEX_DIM = RAG_INDEX.dim || GEMINI_EMBED_DIMENSIONS;
+const INDEX_NORMALIZED = RAG_INDEX.normalized === true;
+// Query vectors only match chunk vectors from the same backend and model.
+const INDEX_EMBEDS_LIKE_QUERIES =
+  (RAG_INDEX.backend || "gemini") === "gemini" && (RAG_INDEX.model || GEMINI_EMBED_MODEL) === GEMINI_EMBED_MODEL;
+// Precomputed top chunks for common questions (build_rag_index.py --queries).
+const ANTICIPATED = RAG_INDEX.anticipated?.queries || {};
+const CHUNKS_BY_ID = new Map(RAG_INDEX.chunks.map((chunk) => [chunk.id, chunk]));
+
 const SYSTEM_PROMPT = `You are a helpful research assistant on Muhammad Ibrahim Khan's personal website. Your role is to answer questions about Ibrahim's research, publications, experience, skills, and background.
 
 Rules:
@@ -62,20 +74,35 @@ export default {
         return jsonResponse({ error: "API key not configured" }, 500, corsHeaders);
       }
 
-      // Step 1: Embed the query
-      const queryEmbedding = await embedText(query, env.GEMINI_API_KEY);
-      if (!queryEmbedding) {
-        return jsonResponse({ error: "Embedding failed" }, 500, corsHeaders);
+      // Steps 1-2: anticipated queries skip the embedding call and the scan
+      let topChunks = anticipatedChunks(query);
+      if (!topChunks) {
+        if (!INDEX_EMBEDS_LIKE_QUERIES) {
+          console.error("Index backend/model not usable for queries:", RAG_INDEX.backend, RAG_INDEX.model);
+          return jsonResponse({ error: "Index incompatible with query embedding" }, 500, corsHeaders);
+        }
+
+        // Step 1: Embed the query
+        const queryEmbedding = await embedText(query, env.GEMINI_API_KEY, INDEX_DIM);
+        if (!queryEmbedding) {
+          return jsonResponse({ error: "Embedding failed" }, 500, corsHeaders);
+        }
+        if (queryEmbedding.length !== INDEX_DIM) {
+          console.error("Query/index dimension mismatch:", queryEmbedding.length, INDEX_DIM);
+          return jsonResponse({ error: "Index incompatible with query embedding" }, 500, corsHeaders);
+        }
+
+        // Step 2: Find top-k similar chunks
+        const similarity = INDEX_NORMALIZED ? dotProduct : cosineSimilarity;
+        const queryVector = INDEX_NORMALIZED ? unitVector(queryEmbedding) : queryEmbedding;
+        const scored = RAG_INDEX.chunks.map((chunk) => ({
+          ...chunk,
+          score: similarity(queryVector, chunk.embedding),
+        }));
+        scored.sort((a, b) => b.score - a.score);
+        topChunks = scored.slice(0, TOP_K);
       }
 
-      // Step 2: Find top-k similar chunks
-      const scored = RAG_INDEX.chunks.map((chunk) => ({
-        ...chunk,
-        score: cosineSimilarity(queryEmbedding, chunk.embedding),
-      }));
-      scored.sort((a, b) => b.score - a.score);
-      const topChunks = scored.slice(0, TOP_K);
-
       // Step 3: Build context and call Gemini
       const context = topChunks
         .map((c) => `[${c.title}]\n${c.text}`)
@@ -103,6 +130,21 @@ function jsonResponse(data, status, corsHeaders) {
   });
 }
 
+// Must match normalize_query() in scripts/rag_queries.py.
+function normalizeQuery(text) {
+  return (text.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || []).join(" ");
+}
+
+function anticipatedChunks(query) {
+  const hits = ANTICIPATED[normalizeQuery(query)];
+  if (!hits) return null;
+  const chunks = hits
+    .slice(0, TOP_K)
+    .filter(([id]) => CHUNKS_BY_ID.has(id))
+    .map(([id, score]) => ({ ...CHUNKS_BY_ID.get(id), score }));
+  return chunks.length ? chunks : null;
+}
+
 function cosineSimilarity(a, b) {
   let dot = 0, magA = 0, magB = 0;
   for (let i = 0; i < a.length; i++) {
@@ -114,7 +156,20 @@ function cosineSimilarity(a, b) {
   return denom === 0 ? 0 : dot / denom;
 }
 
-async function embedText(text, apiKey) {
+function dotProduct(a, b) {
+  let dot = 0;
+  for (let i = 0; i < a.length; i++) {
+    dot += a[i] * b[i];
+  }
+  return dot;
+}
+
+function unitVector(v) {
+  const norm = Math.sqrt(dotProduct(v, v));
+  return norm === 0 ? v : v.map((x) => x / norm);
+}
+
+async function embedText(text, apiKey, dimensions = GEMINI_EMBED_DIMENSIONS) {
   const url = `https://generativelanguage.googleapis.com/v1beta/${GEMINI_EMBED_MODEL}:embedContent?key=${apiKey}`;
   const resp = await fetch(url, {
     method: "POST",
@@ -122,6 +177,7 @@ async function embedText(text, apiKey) {
     body: JSON.stringify({
       model: GEMINI_EMBED_MODEL,
       content: { parts: [{ text }] },
+      ...(dimensions < GEMINI_EMBED_DIMENSIONS ? { outputDimensionality: dimensions } : {}),
     }),
   });
 